@@ -0,0 +1,364 @@
+# /backend/app/analytics.py
+#
+# Column-oriented, in-memory copy of the marks collection for distribution and
+# what-if reports. Each mark is one row across a handful of NumPy arrays (roll
+# number code, subject code, marks, max_marks, exam date epoch, ObjectId bytes),
+# about 37 bytes a mark, and every statistic is a vectorized group-by over them:
+# counts, means and standard deviations via bincount, percentiles from one
+# lexsort, histograms from one bincount over (group, bin) pairs. Pass rates can be
+# asked for at any threshold, not just the 40 marks the report snapshots track.
+#
+# Like the leaderboards in app/ranking.py, every worker keeps its own copy: writes
+# handled here are applied as they happen, a read that passes newer shared
+# collection versions than the arrays were loaded at reloads them first, and they
+# are also reloaded every ANALYTICS_REFRESH_SECONDS.
+
+from datetime import datetime, timezone
+from typing import Optional
+import asyncio
+import time
+
+from bson import ObjectId
+import numpy as np
+
+from app.versions import CollectionVersions, advance, behind
+
+GROUP_BY = ("overall", "subject", "class", "student")
+VALUES = ("marks", "percentage")
+OVERALL = "overall"
+TRACKED = ("marks", "students")
+LOAD_BATCH_SIZE = 10000
+
+EPOCH = datetime(1970, 1, 1)
+COLUMNS = {
+    "roll": np.int32,
+    "subject": np.int32,
+    "marks": np.float32,
+    "max_marks": np.float32,
+    "exam_date": np.int64,
+    "id": "S12",
+}
+
+
+def epoch_seconds(value: datetime) -> int:
+    # MongoDB hands back naive UTC datetimes; aware ones are converted first
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((value - EPOCH).total_seconds())
+
+
+def _id_bytes(value) -> bytes:
+    return (value if isinstance(value, ObjectId) else ObjectId(str(value))).binary
+
+
+class Codes:
+    """Interns strings as dense integer codes."""
+
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+        self.names: list[str] = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+def group_stats(
+    values: np.ndarray,
+    groups: np.ndarray,
+    n_groups: int,
+    percentiles=(),
+    bins: int = 0,
+    value_range: tuple[float, float] = (0.0, 100.0),
+    thresholds=(),
+) -> dict:
+    """Per-group statistics of values; groups holds a code in [0, n_groups) for every value and each code occurs."""
+    values = values.astype(np.float64, copy=False)
+    count = np.bincount(groups, minlength=n_groups)
+    mean = np.bincount(groups, weights=values, minlength=n_groups) / count
+    variance = np.bincount(groups, weights=values * values, minlength=n_groups) / count - mean * mean
+    stats = {"count": count, "mean": mean, "std": np.sqrt(np.maximum(variance, 0))}
+
+    # Sorted by group, then value: each group is one contiguous, ordered run
+    sorted_values = values[np.lexsort((values, groups))]
+    first = np.cumsum(count) - count
+    last = first + count - 1
+    stats["min"], stats["max"] = sorted_values[first], sorted_values[last]
+    for q in percentiles:
+        # Linear interpolation between the closest ranks, as numpy.percentile does
+        position = first + (q / 100.0) * (count - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        fraction = position - lower
+        stats[f"p{q:g}"] = sorted_values[lower] + fraction * (sorted_values[upper] - sorted_values[lower])
+
+    for threshold in thresholds:
+        stats[f"pass_rate@{threshold:g}"] = np.bincount(groups, weights=values >= threshold, minlength=n_groups) / count
+
+    if bins:
+        low, high = value_range
+        # Values outside the range land in the first or last bin
+        index = np.clip(((values - low) * (bins / (high - low))).astype(np.int64), 0, bins - 1)
+        stats["histogram"] = np.bincount(groups * bins + index, minlength=n_groups * bins).reshape(n_groups, bins)
+    return stats
+
+
+class MarksAnalytics:
+    def __init__(self, db, refresh_seconds: float = 300, compact_ratio: float = 0.25):
+        self.db = db
+        self.refresh_seconds = refresh_seconds
+        self.compact_ratio = compact_ratio
+        self.rolls = Codes()
+        self.subjects = Codes()
+        self.classes = Codes()
+        self.student_classes: dict[int, int] = {}  # roll code -> class code
+        self.columns = {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+        self.live = np.empty(0, dtype=bool)  # False for deleted (or since updated) rows
+        self.loaded_at: Optional[float] = None
+        self.versions: Optional[dict[str, int]] = None  # The shared versions the arrays reflect
+        self._pending: list[tuple] = []  # appended rows not yet in the arrays
+        self._student_class = np.empty(0, dtype=np.int32)
+        self._students_dirty = True
+        self._dirty = True
+        self._generation = 0
+        self._reload_task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _row(self, mark: dict) -> tuple:
+        return (
+            self.rolls.code(mark["student_id"]),
+            self.subjects.code(mark["subject"]),
+            mark["marks"],
+            mark["max_marks"],
+            epoch_seconds(mark["exam_date"]),
+            _id_bytes(mark["_id"]),
+        )
+
+    # Loading
+    async def load(self, wanted: Optional[dict] = None):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if wanted is not None and not self._dirty and not behind(self.versions, wanted, TRACKED):
+                return  # Another request's reload already caught up
+            generation = self._generation
+            # Read first: writes that land during the load make the arrays newer, never older, than this
+            versions = await CollectionVersions(self.db).current(TRACKED)
+            # Fresh code tables, so names of deleted students and subjects don't pile up
+            rolls, subjects, classes = Codes(), Codes(), Codes()
+            student_classes = {
+                rolls.code(s["roll_number"]): classes.code(s["class_name"])
+                async for s in self.db.students.find({}, {"_id": 0, "roll_number": 1, "class_name": 1})
+            }
+            rows = {name: [] for name in COLUMNS}
+            projection = {"student_id": 1, "subject": 1, "marks": 1, "max_marks": 1, "exam_date": 1}
+            async for mark in self.db.marks.find({}, projection).batch_size(LOAD_BATCH_SIZE):
+                rows["roll"].append(rolls.code(mark["student_id"]))
+                rows["subject"].append(subjects.code(mark["subject"]))
+                rows["marks"].append(mark["marks"])
+                rows["max_marks"].append(mark["max_marks"])
+                rows["exam_date"].append(epoch_seconds(mark["exam_date"]))
+                rows["id"].append(mark["_id"].binary)
+
+            columns = {name: np.array(rows[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+            # Swap everything at once; reads never see half a load
+            self.rolls, self.subjects, self.classes = rolls, subjects, classes
+            self.student_classes = student_classes
+            self.columns, self.live, self._pending = columns, np.ones(len(columns["id"]), dtype=bool), []
+            self._students_dirty = True
+            self.loaded_at = time.monotonic()
+            self.versions = versions
+            # A write that raced the load may be missing from it; reload again on the next read
+            self._dirty = self._generation != generation
+
+    async def ensure_fresh(self, versions: Optional[dict] = None):
+        """Reload first if dirty, or if versions (the request's, from conditional()) are newer than the arrays."""
+        if self._dirty or self.loaded_at is None:
+            await self.load()
+        elif versions is not None and behind(self.versions, versions, TRACKED):
+            await self.load(versions)
+        elif time.monotonic() - self.loaded_at > self.refresh_seconds:
+            # Serve the current arrays while a background reload catches up
+            if self._reload_task is None or self._reload_task.done():
+                self._reload_task = asyncio.create_task(self.load())
+
+    def _flush(self):
+        if self._pending:
+            appended = list(zip(*self._pending))
+            self.columns = {
+                name: np.concatenate((self.columns[name], np.array(appended[i], dtype=dtype)))
+                for i, (name, dtype) in enumerate(COLUMNS.items())
+            }
+            self.live = np.concatenate((self.live, np.ones(len(self._pending), dtype=bool)))
+            self._pending = []
+
+        dead = len(self.live) - int(self.live.sum())
+        if dead and dead > self.compact_ratio * len(self.live):
+            self.columns = {name: column[self.live] for name, column in self.columns.items()}
+            self.live = np.ones(len(self.columns["id"]), dtype=bool)
+
+        # Marks can bring roll numbers no student here has (another worker's new student,
+        # an update to an unknown student_id); their codes map to -1 like any orphan
+        if self._students_dirty or len(self.rolls) > len(self._student_class):
+            self._student_class = np.full(len(self.rolls), -1, dtype=np.int32)
+            if self.student_classes:
+                self._student_class[np.fromiter(self.student_classes.keys(), dtype=np.int64)] = list(
+                    self.student_classes.values()
+                )
+            self._students_dirty = False
+
+    # Incremental maintenance
+    def marks_changed(self, changes: list[tuple[Optional[dict], Optional[dict]]]):
+        """Apply (old_mark, new_mark) pairs, as in ReportSnapshots.marks_changed."""
+        self._generation += 1
+        if self.loaded_at is None:
+            return  # Not loaded yet; the first read loads everything
+        if any("_id" not in mark for pair in changes for mark in pair if mark is not None):
+            self._dirty = True
+            return
+
+        removed = [_id_bytes(old["_id"]) for old, _ in changes if old is not None]
+        if removed:
+            self._flush()
+            self.live &= ~np.isin(self.columns["id"], np.array(removed, dtype=COLUMNS["id"]))
+        self._pending += [self._row(new) for _, new in changes if new is not None]
+
+    def students_added(self, *students: dict):
+        self._generation += 1
+        for student in students:
+            self.student_classes[self.rolls.code(student["roll_number"])] = self.classes.code(student["class_name"])
+        self._students_dirty = True
+
+    def advance(self, bumped: dict):
+        """After applying a write of this process's, the versions bump() returned for it."""
+        self.versions = advance(self.versions, bumped)
+
+    def invalidate(self):
+        # Class moves, renames, cascade deletes and orphan cleanup: reload on the next read
+        self._generation += 1
+        self._dirty = True
+
+    # Queries
+    def _select(
+        self,
+        group_by: str,
+        value: str,
+        subject: Optional[str],
+        class_name: Optional[str],
+        date_from: Optional[datetime],
+        date_to: Optional[datetime],
+    ) -> tuple[np.ndarray, np.ndarray, list[str]]:
+        self._flush()
+        columns = self.columns
+        mask = self.live.copy()
+        mark_classes = self._student_class[columns["roll"]]
+        for name, codes, column in (
+            (subject, self.subjects, columns["subject"]),
+            (class_name, self.classes, mark_classes),
+        ):
+            if name is not None:
+                mask &= column == codes.codes.get(name, -1)
+        if date_from is not None:
+            mask &= columns["exam_date"] >= epoch_seconds(date_from)
+        if date_to is not None:
+            mask &= columns["exam_date"] <= epoch_seconds(date_to)
+        if group_by in ("class", "student"):
+            # Marks without a student don't count towards student or class reports
+            mask &= mark_classes >= 0
+
+        if value == "percentage":
+            mask &= columns["max_marks"] > 0
+            values = 100.0 * columns["marks"][mask].astype(np.float64) / columns["max_marks"][mask]
+        else:
+            values = columns["marks"][mask]
+
+        if group_by == OVERALL:
+            return values, np.zeros(len(values), dtype=np.int64), [OVERALL] if len(values) else []
+        codes, names = {
+            "subject": (columns["subject"], self.subjects.names),
+            "class": (mark_classes, self.classes.names),
+            "student": (columns["roll"], self.rolls.names),
+        }[group_by]
+        present, groups = np.unique(codes[mask], return_inverse=True)
+        return values, groups, [names[code] for code in present]
+
+    async def distribution(
+        self,
+        group_by: str = "subject",
+        value: str = "percentage",
+        percentiles=(25, 50, 75),
+        bins: int = 10,
+        value_range: tuple[float, float] = (0.0, 100.0),
+        pass_threshold: float = 40,
+        subject: Optional[str] = None,
+        class_name: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        versions: Optional[dict] = None,
+    ) -> dict:
+        await self.ensure_fresh(versions)
+        values, groups, names = self._select(group_by, value, subject, class_name, date_from, date_to)
+        stats = group_stats(values, groups, len(names), percentiles, bins, value_range, (pass_threshold,))
+        return {
+            "group_by": group_by,
+            "value": value,
+            "bin_edges": np.linspace(*value_range, bins + 1).tolist(),
+            "groups": [
+                {
+                    "_id": name,
+                    "count": int(stats["count"][i]),
+                    "mean": float(stats["mean"][i]),
+                    "std": float(stats["std"][i]),
+                    "min": float(stats["min"][i]),
+                    "max": float(stats["max"][i]),
+                    "percentiles": {f"{q:g}": float(stats[f"p{q:g}"][i]) for q in percentiles},
+                    "pass_rate": float(stats[f"pass_rate@{pass_threshold:g}"][i]),
+                    "histogram": stats["histogram"][i].tolist(),
+                }
+                for i, name in enumerate(names)
+            ],
+        }
+
+    async def pass_rates(
+        self,
+        thresholds,
+        group_by: str = "subject",
+        value: str = "percentage",
+        subject: Optional[str] = None,
+        class_name: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        versions: Optional[dict] = None,
+    ) -> dict:
+        await self.ensure_fresh(versions)
+        values, groups, names = self._select(group_by, value, subject, class_name, date_from, date_to)
+        stats = group_stats(values, groups, len(names), thresholds=thresholds)
+        return {
+            "group_by": group_by,
+            "value": value,
+            "thresholds": list(thresholds),
+            "groups": [
+                {
+                    "_id": name,
+                    "count": int(stats["count"][i]),
+                    "pass_rates": {f"{t:g}": float(stats[f"pass_rate@{t:g}"][i]) for t in thresholds},
+                }
+                for i, name in enumerate(names)
+            ],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "marks": int(self.live.sum()) + len(self._pending),
+            "rows": len(self.live) + len(self._pending),
+            "bytes": sum(column.nbytes for column in self.columns.values()) + self.live.nbytes,
+            "students": len(self.student_classes),
+            "subjects": len(self.subjects),
+            "age_seconds": time.monotonic() - self.loaded_at if self.loaded_at is not None else None,
+        }
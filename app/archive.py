@@ -0,0 +1,362 @@
+# /backend/app/archive.py
+#
+# Hot/cold archival of marks by exam term. Marks from terms that ended before a
+# cutoff move out of the hot marks collection, which every report, $lookup and
+# index works over, into one archive per term:
+#
+#   collection   marks_archive_<year>_t<n>, indexed like marks (the default)
+#   file         <MARKS_ARCHIVE_DIRECTORY>/marks_<year>-t<n>.ndjson.gz, Extended JSON,
+#                local to the machine that ran the archival
+#
+# Terms are TERM_MONTHS long from January (three a year by default), and only
+# whole terms are archived, so a term is either hot or archived. (Marks entered
+# later for an archived term stay hot and are merged in when the term is read.)
+#
+# Archival runs in batches ordered by _id: each batch is written to its term's
+# archive first and only then deleted from marks. A run that stops part way can
+# simply be started again; documents written but not yet deleted are skipped (in
+# collections) or de-duplicated on read (in files).
+#
+# File archives are for cold terms that are rarely read: any query against one
+# decompresses and scans the whole term. Term summaries (per-subject stats) are
+# cached per process until the term's archived count changes, so only the first
+# report on a file-archived term pays for the scan.
+#
+#   python -m app.archive --before 2024-01-01 [--target file] [--compact]
+
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+
+from bson import json_util
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import BulkWriteError
+
+from app.reports import add_mark, subject_stats
+from app.versions import CollectionVersions
+
+TERM_MONTHS = int(os.getenv("TERM_MONTHS", "4"))
+ARCHIVE_BATCH_SIZE = 1000
+TERMS_COLLECTION = "archived_terms"
+READ_CHUNK_LINES = 5000
+DUPLICATE_KEY = 11000
+
+# Canonical Extended JSON round-trips ObjectIds, datetimes and number types exactly;
+# datetimes come back naive UTC, as from the database
+JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS.with_options(tz_aware=False)
+
+ARCHIVE_INDEXES = [
+    IndexModel(
+        [("student_id", ASCENDING), ("subject", ASCENDING), ("exam_date", ASCENDING)],
+        name="student_subject_exam_date",
+    ),
+    IndexModel([("subject", ASCENDING), ("exam_date", ASCENDING)], name="subject_exam_date"),
+]
+
+
+def term_of(date: datetime) -> str:
+    return f"{date.year}-t{(date.month - 1) // TERM_MONTHS + 1}"
+
+
+def term_bounds(term: str) -> tuple[datetime, datetime]:
+    """[start, end) of a term name from term_of()."""
+    year, number = term.split("-t")
+    month = (int(number) - 1) * TERM_MONTHS + 1
+    start = datetime(int(year), month, 1)
+    end_month = month + TERM_MONTHS
+    end = datetime(int(year) + (end_month - 1) // 12, (end_month - 1) % 12 + 1, 1)
+    return start, end
+
+
+def term_start(date: datetime) -> datetime:
+    return term_bounds(term_of(date))[0]
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """The subset of MongoDB query syntax the history and report endpoints use, for file archives."""
+    for field, condition in query.items():
+        value = doc.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, operand in condition.items():
+            if op == "$in":
+                ok = value in operand
+            elif value is None:
+                ok = False
+            elif op == "$gte":
+                ok = value >= operand
+            elif op == "$gt":
+                ok = value > operand
+            elif op == "$lte":
+                ok = value <= operand
+            elif op == "$lt":
+                ok = value < operand
+            else:
+                raise ValueError(f"Unsupported operator for archived marks: {op}")
+            if not ok:
+                return False
+    return True
+
+
+class CollectionArchive:
+    location = "collection"
+
+    def __init__(self, db):
+        self.db = db
+        self._indexed: set[str] = set()
+
+    def name(self, term: str) -> str:
+        return "marks_archive_" + term.replace("-", "_")
+
+    async def write(self, term: str, docs: list[dict]):
+        collection = self.db[self.name(term)]
+        if term not in self._indexed:
+            await collection.create_indexes(ARCHIVE_INDEXES)
+            self._indexed.add(term)
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Already archived by an interrupted run; anything else is a real failure
+            if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                raise
+
+    async def read(self, term: str, query: dict) -> AsyncIterator[dict]:
+        async for doc in self.db[self.name(term)].find(query):
+            yield doc
+
+    async def subject_stats(self, term: str) -> dict[str, dict]:
+        return await subject_stats(self.db[self.name(term)], {})
+
+
+class FileArchive:
+    location = "file"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def name(self, term: str) -> str:
+        return os.path.join(self.directory, f"marks_{term}.ndjson.gz")
+
+    def _append(self, path: str, data: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        # One gzip member per batch; concatenated members read back as one stream
+        with open(path, "ab") as f:
+            f.write(gzip.compress(data))
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def write(self, term: str, docs: list[dict]):
+        data = "".join(json_util.dumps(doc, json_options=JSON_OPTIONS) + "\n" for doc in docs).encode()
+        await asyncio.to_thread(self._append, self.name(term), data)
+
+    async def read(self, term: str, query: dict) -> AsyncIterator[dict]:
+        path = self.name(term)
+        if not os.path.exists(path):
+            return
+        f = await asyncio.to_thread(gzip.open, path, "rt")
+        seen = set()
+        try:
+            while True:
+                # Decompress and parse off the event loop, a chunk at a time
+                docs = await asyncio.to_thread(self._read_chunk, f)
+                if not docs:
+                    break
+                for doc in docs:
+                    if doc["_id"] not in seen and matches(doc, query):
+                        seen.add(doc["_id"])
+                        yield doc
+        finally:
+            f.close()
+
+    async def subject_stats(self, term: str) -> dict[str, dict]:
+        stats = {}
+        async for doc in self.read(term, {}):
+            add_mark(stats, doc)
+        return stats
+
+    @staticmethod
+    def _read_chunk(f) -> list[dict]:
+        docs = []
+        for line in f:
+            docs.append(json_util.loads(line, json_options=JSON_OPTIONS))
+            if len(docs) >= READ_CHUNK_LINES:
+                break
+        return docs
+
+
+class MarksArchive:
+    """Moves whole terms out of marks and reads them back on demand."""
+
+    def __init__(
+        self,
+        db,
+        directory: str = "archive",
+        on_archived=None,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        pause_seconds: float = 0.05,
+    ):
+        self.db = db
+        self.backends = {"collection": CollectionArchive(db), "file": FileArchive(directory)}
+        self.on_archived = on_archived
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.running = False
+        self.last_run: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._subject_stats: dict[str, tuple[int, dict]] = {}  # term -> (archived count, stats)
+
+    @property
+    def terms_collection(self):
+        return self.db[TERMS_COLLECTION]
+
+    async def terms(self) -> list[dict]:
+        return await self.terms_collection.find().sort("start", ASCENDING).to_list(length=None)
+
+    # Archival
+    async def run(self, before: datetime, target: str = "collection") -> dict:
+        backend = self.backends[target]
+        cutoff = term_start(before)
+        run = {
+            "cutoff": cutoff,
+            "target": target,
+            "status": "running",
+            "moved": 0,
+            "terms": {},
+            "started_at": datetime.utcnow(),
+            "finished_at": None,
+            "error": None,
+        }
+        self.running = True
+        self.last_run = run
+        try:
+            # A term archived to one location stays there; mixing would hide marks from reads
+            elsewhere = await self.terms_collection.find_one({"start": {"$lt": cutoff}, "location": {"$ne": target}})
+            if elsewhere is not None:
+                raise ValueError(f"Term {elsewhere['_id']} is already archived to a {elsewhere['location']}")
+
+            last_id = None
+            while True:
+                query = {"exam_date": {"$lt": cutoff}}
+                if last_id is not None:
+                    query["_id"] = {"$gt": last_id}
+                batch = await self.db.marks.find(query).sort("_id", ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+                if not batch:
+                    break
+                last_id = batch[-1]["_id"]
+
+                by_term: dict[str, list[dict]] = {}
+                for mark in batch:
+                    by_term.setdefault(term_of(mark["exam_date"]), []).append(mark)
+                for term, docs in by_term.items():
+                    start, end = term_bounds(term)
+                    # Register the term before moving anything, so readers look for it from the first batch
+                    await self.terms_collection.update_one(
+                        {"_id": term},
+                        {
+                            "$setOnInsert": {"start": start, "end": end, "location": target, "name": backend.name(term), "count": 0},
+                            "$set": {"archived_at": datetime.utcnow()},
+                        },
+                        upsert=True,
+                    )
+                    await backend.write(term, docs)
+                    result = await self.db.marks.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+                    await self.terms_collection.update_one({"_id": term}, {"$inc": {"count": result.deleted_count}})
+                    run["moved"] += result.deleted_count
+                    run["terms"][term] = run["terms"].get(term, 0) + result.deleted_count
+
+                if self.on_archived:
+                    await self.on_archived(batch)
+                # Here rather than in on_archived, so runs from the command line invalidate ETags too
+                await CollectionVersions(self.db).bump("marks")
+                # Yield between batches so regular traffic isn't starved
+                await asyncio.sleep(self.pause_seconds)
+            run["status"] = "completed"
+        except Exception as e:
+            run["status"] = "failed"
+            run["error"] = str(e)
+            raise
+        finally:
+            self.running = False
+            run["finished_at"] = datetime.utcnow()
+        return run
+
+    def start(self, before: datetime, target: str = "collection") -> bool:
+        """Run in the background; False if a run is already in progress."""
+        if self._task is not None and not self._task.done():
+            return False
+        self._task = asyncio.create_task(self.run(before, target))
+        self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return True
+
+    def stats(self) -> dict:
+        return {"running": self.running, "last_run": self.last_run}
+
+    # Reads
+    async def find(self, query: dict, terms: Optional[Iterable[str]] = None) -> list[dict]:
+        return [mark async for mark in self.iter_find(query, terms)]
+
+    async def iter_find(self, query: dict, terms: Optional[Iterable[str]] = None) -> AsyncIterator[dict]:
+        """Archived marks matching query, from the given terms or every archived term the query's exam_date range overlaps."""
+        term_query = {}
+        if terms is not None:
+            term_query["_id"] = {"$in": list(terms)}
+        dates = query.get("exam_date")
+        if isinstance(dates, dict):
+            if "$gte" in dates or "$gt" in dates:
+                term_query["end"] = {"$gt": dates.get("$gte", dates.get("$gt"))}
+            if "$lte" in dates or "$lt" in dates:
+                term_query["start"] = {"$lte": dates.get("$lte", dates.get("$lt"))}
+
+        async for term in self.terms_collection.find(term_query).sort("start", ASCENDING):
+            async for doc in self.backends[term["location"]].read(term["_id"], query):
+                yield {**doc, "_id": str(doc["_id"]), "term": term["_id"]}
+
+    async def subject_stats(self, term: str) -> dict[str, dict]:
+        """Per-subject stats of an archived term (empty if it isn't archived), for summarize_subjects."""
+        info = await self.terms_collection.find_one({"_id": term})
+        if info is None:
+            return {}
+        cached = self._subject_stats.get(term)
+        if cached is not None and cached[0] == info["count"]:
+            return cached[1]
+        stats = await self.backends[info["location"]].subject_stats(term)
+        # Only archival adds to a term, and it moves the count; a term's stats can't change under the same count
+        self._subject_stats[term] = (info["count"], stats)
+        return stats
+
+
+async def main() -> int:
+    from app.database import database
+    from app.reports import ReportSnapshots
+
+    parser = argparse.ArgumentParser(description="Archive marks from terms that ended before a date")
+    parser.add_argument("--before", required=True, type=datetime.fromisoformat, help="e.g. 2024-01-01")
+    parser.add_argument("--target", choices=["collection", "file"], default="collection")
+    parser.add_argument("--directory", default=os.getenv("MARKS_ARCHIVE_DIRECTORY", "archive"))
+    parser.add_argument("--compact", action="store_true", help="compact marks afterwards to return the space")
+    args = parser.parse_args()
+
+    run = await MarksArchive(database, directory=args.directory, pause_seconds=0).run(args.before, args.target)
+    for term, count in sorted(run["terms"].items()):
+        print(f"{term}: {count} marks")
+    print(f"Archived {run['moved']} marks from before {run['cutoff']:%Y-%m-%d} to {args.target}")
+
+    if run["moved"]:
+        # Reports only cover the hot marks from here on
+        count = await ReportSnapshots(database).rebuild()
+        print(f"Rebuilt {count} report snapshots")
+    if args.compact:
+        await database.command("compact", "marks")
+        print("Compacted marks")
+    database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
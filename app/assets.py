@@ -0,0 +1,108 @@
+# /backend/app/assets.py
+#
+# Content-fingerprinted static assets.
+#
+#   python -m app.assets            # after changing anything under static/
+#
+# copies every file under static/ to static/dist/ with a hash of its contents in
+# the name (js/main.js -> js/main.3f9a1c2b7d4e.js) and writes templates/dist/,
+# a copy of the templates whose url_for('static', ...) references point at those
+# copies. A fingerprinted file never changes under its name, so it is served with
+# a year-long immutable Cache-Control and browsers stop revalidating it; a new
+# build changes the name and with it the URL.
+#
+# The app serves templates/dist/ when it exists and falls back to templates/
+# otherwise (with the original assets, revalidated on every load).
+
+import hashlib
+import os
+import re
+import shutil
+import sys
+
+from starlette.staticfiles import StaticFiles
+
+STATIC_DIRECTORY = "static"
+TEMPLATE_DIRECTORY = "templates"
+DIST = "dist"
+HASH_LENGTH = 12
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+STATIC_REFERENCE = re.compile(r"""url_for\(\s*(['"])static\1\s*,\s*path\s*=\s*(['"])/?([^'"]+)\2\s*\)""")
+
+
+def fingerprinted_name(path: str, data: bytes) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def build(static_directory: str = STATIC_DIRECTORY, template_directory: str = TEMPLATE_DIRECTORY) -> dict[str, str]:
+    """Fingerprint static assets and rewrite the templates; returns {original path: fingerprinted path}."""
+    static_dist = os.path.join(static_directory, DIST)
+    template_dist = os.path.join(template_directory, DIST)
+    for directory in (static_dist, template_dist):
+        shutil.rmtree(directory, ignore_errors=True)
+
+    manifest = {}
+    for root, directories, files in os.walk(static_directory):
+        if root == static_directory and DIST in directories:
+            directories.remove(DIST)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            path = os.path.relpath(source, static_directory).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            target = f"{DIST}/{fingerprinted_name(path, data)}"
+            os.makedirs(os.path.dirname(os.path.join(static_directory, target)), exist_ok=True)
+            with open(os.path.join(static_directory, target), "wb") as f:
+                f.write(data)
+            manifest[path] = target
+
+    def rewrite(match: re.Match) -> str:
+        target = manifest.get(match.group(3))
+        if target is None:
+            return match.group(0)
+        return f"url_for('static', path='/{target}')"
+
+    os.makedirs(template_dist, exist_ok=True)
+    for name in sorted(os.listdir(template_directory)):
+        source = os.path.join(template_directory, name)
+        if not os.path.isfile(source):
+            continue
+        with open(source, encoding="utf-8") as f:
+            template = f.read()
+        with open(os.path.join(template_dist, name), "w", encoding="utf-8") as f:
+            f.write(STATIC_REFERENCE.sub(rewrite, template))
+    return manifest
+
+
+def template_directory(directory: str = TEMPLATE_DIRECTORY) -> str:
+    dist = os.path.join(directory, DIST)
+    return dist if os.path.isdir(dist) else directory
+
+
+def cache_control(path: str) -> str:
+    # Only fingerprinted copies are safe to cache forever
+    return IMMUTABLE if path.replace(os.sep, "/").startswith(f"{DIST}/") else REVALIDATE
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with Cache-Control from cache_control()."""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        response.headers["Cache-Control"] = cache_control(path)
+        return response
+
+
+def main() -> int:
+    manifest = build()
+    for path, target in sorted(manifest.items()):
+        print(f"{path} -> {target}")
+    print(f"Fingerprinted {len(manifest)} files; templates written to {os.path.join(TEMPLATE_DIRECTORY, DIST)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# /backend/app/cascade.py
+#
+# Cascade deletes and orphan cleanup for students and their marks.
+#
+# delete_students() removes students together with their marks and their student
+# login in one transaction per batch, so a reader never sees a student without
+# marks half-deleted or marks whose student is gone. Transactions need a replica
+# set; a single-node one is enough for local development:
+#
+#   mongod --replSet rs0    then once:    mongosh --eval "rs.initiate()"
+#
+# Against a standalone mongod the same deletes run in order (marks, login,
+# student) without the atomicity guarantee.
+#
+# OrphanCompactor removes marks left behind by students deleted before cascades
+# existed (or by any other path), in batches:
+#
+#   python -m app.cascade --compact-orphans
+
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+import asyncio
+import sys
+
+from app.versions import CollectionVersions
+
+TRANSACTION_BATCH_SIZE = 500
+ORPHAN_BATCH_SIZE = 1000
+
+_transactions_supported: dict[int, bool] = {}
+
+
+async def supports_transactions(client) -> bool:
+    key = id(client)
+    if key not in _transactions_supported:
+        hello = await client.admin.command("hello")
+        _transactions_supported[key] = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+    return _transactions_supported[key]
+
+
+async def _delete_batch(db, query: dict, batch_size: int, session=None):
+    students = await db.students.find(query, session=session).limit(batch_size).to_list(length=batch_size)
+    if not students:
+        return students, [], 0, 0
+    roll_numbers = [student["roll_number"] for student in students]
+    subjects = await db.marks.distinct("subject", {"student_id": {"$in": roll_numbers}}, session=session)
+    marks = await db.marks.delete_many({"student_id": {"$in": roll_numbers}}, session=session)
+    users = await db.users.delete_many({"username": {"$in": roll_numbers}, "role": "student"}, session=session)
+    await db.students.delete_many({"_id": {"$in": [student["_id"] for student in students]}}, session=session)
+    return students, subjects, marks.deleted_count, users.deleted_count
+
+
+async def delete_students(db, query: dict, batch_size: int = TRANSACTION_BATCH_SIZE) -> dict:
+    """Delete every student matching query with their marks and login; returns what was removed."""
+    removed = {"students": [], "subjects": set(), "marks": 0, "users": 0}
+    transactional = await supports_transactions(db.client)
+    while True:
+        if transactional:
+            async with await db.client.start_session() as session:
+                batch = await session.with_transaction(
+                    lambda s: _delete_batch(db, query, batch_size, session=s)
+                )
+        else:
+            batch = await _delete_batch(db, query, batch_size)
+        students, subjects, marks, users = batch
+        if not students:
+            break
+        removed["students"] += students
+        removed["subjects"].update(subjects)
+        removed["marks"] += marks
+        removed["users"] += users
+    removed["subjects"] = sorted(removed["subjects"])
+    return removed
+
+
+class OrphanCompactor:
+    """Deletes marks whose student_id matches no student, one batch of roll numbers at a time."""
+
+    def __init__(
+        self,
+        db,
+        on_removed: Optional[Callable[[list], Awaitable]] = None,
+        batch_size: int = ORPHAN_BATCH_SIZE,
+        pause_seconds: float = 0.05,
+    ):
+        self.db = db
+        self.on_removed = on_removed
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.running = False
+        self.last_started: Optional[datetime] = None
+        self.last_finished: Optional[datetime] = None
+        self.last_removed = 0
+        self.removed_total = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> int:
+        self.running = True
+        self.last_started = datetime.utcnow()
+        self.last_error = None
+        removed = 0
+        try:
+            # Streamed rather than distinct(), whose single result document caps at 16MB;
+            # the $sort lets the $group walk the student_id index instead of the documents
+            known = {s["roll_number"] async for s in self.db.students.find({}, {"_id": 0, "roll_number": 1})}
+            orphaned = [
+                row["_id"]
+                async for row in self.db.marks.aggregate([{"$sort": {"student_id": 1}}, {"$group": {"_id": "$student_id"}}])
+                if row["_id"] not in known
+            ]
+            for start in range(0, len(orphaned), self.batch_size):
+                batch = orphaned[start:start + self.batch_size]
+                # A student may have been created with one of these roll numbers since we looked
+                batch = list(set(batch) - set(await self.db.students.distinct("roll_number", {"roll_number": {"$in": batch}})))
+                if not batch:
+                    continue
+                subjects = await self.db.marks.distinct("subject", {"student_id": {"$in": batch}})
+                result = await self.db.marks.delete_many({"student_id": {"$in": batch}})
+                removed += result.deleted_count
+                self.removed_total += result.deleted_count
+                if result.deleted_count:
+                    if self.on_removed:
+                        await self.on_removed(subjects)
+                    # Here rather than in on_removed, so runs from the command line invalidate ETags too
+                    await CollectionVersions(self.db).bump("marks")
+                # Yield between batches so regular traffic isn't starved
+                await asyncio.sleep(self.pause_seconds)
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self.running = False
+            self.last_removed = removed
+            self.last_finished = datetime.utcnow()
+        return removed
+
+    def start(self) -> bool:
+        """Run in the background; False if a run is already in progress."""
+        if self._task is not None and not self._task.done():
+            return False
+        self._task = asyncio.create_task(self.run())
+        self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return True
+
+    async def run_every(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.run()
+            except Exception as e:
+                print(f"Error compacting orphaned marks: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_removed": self.last_removed,
+            "removed_total": self.removed_total,
+            "last_error": self.last_error,
+        }
+
+
+async def main() -> int:
+    from app.database import database
+    from app.reports import ReportSnapshots
+
+    snapshots = ReportSnapshots(database)
+    removed = await OrphanCompactor(database, on_removed=snapshots.subjects_changed, pause_seconds=0).run()
+    print(f"Removed {removed} orphaned marks")
+    database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    if "--compact-orphans" not in sys.argv[1:]:
+        print("Usage: python -m app.cascade --compact-orphans")
+        sys.exit(2)
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,169 @@
+# /backend/app/compression.py
+#
+# Response compression negotiated from Accept-Encoding: brotli when the optional
+# brotli package is installed and the client accepts it, otherwise gzip.
+#
+# Whole responses below minimum_size go out as they are (the headers would eat
+# the saving). Streamed responses (exports, the marksheet ZIP) are compressed as
+# they stream, unless their type is excluded: event streams must reach the client
+# unbuffered, and ZIP archives and images are compressed already.
+#
+# A compressed body is a different representation from the identity one, so it
+# can't carry the handler's strong ETag; the tag is weakened (W/"...") instead,
+# which If-None-Match still matches by weak comparison (app.versions.etag_matches).
+
+from typing import Iterable, Optional
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_EXCLUDED_TYPES = ("text/event-stream", "application/zip", "application/pdf", "image/")
+
+
+def weak_etag(value: bytes) -> bytes:
+    return value if value.startswith(b"W/") else b"W/" + value
+
+
+def accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+def _with_weak_etag(headers) -> list:
+    return [(name, weak_etag(value) if name.lower() == b"etag" else value) for name, value in headers]
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        encodings: Iterable[str] = ("br", "gzip"),
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        excluded_types: Iterable[str] = DEFAULT_EXCLUDED_TYPES,
+    ):
+        self.app = app
+        # In order of preference; br only if the package is there
+        self.encodings = [e for e in encodings if e == "gzip" or (e == "br" and brotli is not None)]
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_types = tuple(excluded_types)
+
+    def _choose(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accepted = accepted_encodings(value.decode("latin-1"))
+                return next((e for e in self.encodings if e in accepted), None)
+        return None
+
+    def _compressor(self, encoding: str):
+        return _Brotli(self.brotli_quality) if encoding == "br" else _Gzip(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        encoding = self._choose(scope) if scope["type"] == "http" and self.encodings else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # held until the first body chunk decides the encoding
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = {name.lower(): value for name, value in start["headers"]}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (
+                    b"content-encoding" in headers
+                    or start["status"] < 200
+                    or start["status"] in (204, 304)
+                    or content_type.startswith(self.excluded_types)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    if start["status"] == 304:
+                        # Revalidates what was most likely sent compressed; keep its validator
+                        start = {**start, "headers": _with_weak_etag(start["headers"])}
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = self._compressor(encoding)
+                response_headers = [
+                    (name, value) for name, value in _with_weak_etag(start["headers"])
+                    if name.lower() not in (b"content-length", b"vary")
+                ]
+                vary = headers.get(b"vary")
+                response_headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                response_headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    data = compressor.compress(body) + compressor.finish()
+                    response_headers.append((b"content-length", str(len(data)).encode()))
+                    await send({**start, "headers": response_headers})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send({**start, "headers": response_headers})
+
+            if more_body:
+                # Flush each chunk, so a streamed export reaches the client as it is produced
+                data = compressor.compress(body) + compressor.flush()
+            else:
+                data = compressor.compress(body) + compressor.finish()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,21 +1,10 @@
 # /backend/app/create_student_user.py
 
-from motor.motor_asyncio import AsyncIOMotorClient
-from passlib.context import CryptContext
+# Run from the repository root: python -m app.create_student_user
 import asyncio
-import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# MongoDB connection
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGODB_URL)
-db = client.student_marksheet_db
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.database import database as db
+from app.hashing import pwd_context
 
 async def create_student_user():
     # Student user data
@@ -0,0 +1,164 @@
+# /backend/app/database.py
+#
+# The one MongoDB client shared by the API and the admin scripts.
+#
+# The client is created on first use (or explicitly by the app's lifespan), not
+# at import time, so a process that forks workers never shares sockets with
+# them. Pool sizing, timeouts and read preference come from the environment:
+#
+#   MONGODB_URL, MONGODB_DB
+#   MONGODB_MAX_POOL_SIZE (100), MONGODB_MIN_POOL_SIZE (0), MONGODB_MAX_IDLE_TIME_MS
+#   MONGODB_SERVER_SELECTION_TIMEOUT_MS (5000), MONGODB_CONNECT_TIMEOUT_MS (5000)
+#   MONGODB_SOCKET_TIMEOUT_MS, MONGODB_WAIT_QUEUE_TIMEOUT_MS
+#   MONGODB_READ_PREFERENCE (primary)
+#   MONGODB_WARMUP_CONNECTIONS (defaults to the min pool size)
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from typing import Optional
+import asyncio
+import os
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+INT_OPTIONS = {
+    "maxPoolSize": "MONGODB_MAX_POOL_SIZE",
+    "minPoolSize": "MONGODB_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGODB_MAX_IDLE_TIME_MS",
+    "serverSelectionTimeoutMS": "MONGODB_SERVER_SELECTION_TIMEOUT_MS",
+    "connectTimeoutMS": "MONGODB_CONNECT_TIMEOUT_MS",
+    "socketTimeoutMS": "MONGODB_SOCKET_TIMEOUT_MS",
+    "waitQueueTimeoutMS": "MONGODB_WAIT_QUEUE_TIMEOUT_MS",
+}
+DEFAULT_OPTIONS = {
+    "maxPoolSize": 100,
+    "minPoolSize": 0,
+    "serverSelectionTimeoutMS": 5000,
+    "connectTimeoutMS": 5000,
+}
+
+
+def client_options() -> dict:
+    options = dict(DEFAULT_OPTIONS)
+    for option, env_name in INT_OPTIONS.items():
+        value = os.getenv(env_name)
+        if value:
+            options[option] = int(value)
+    options["readPreference"] = os.getenv("MONGODB_READ_PREFERENCE", "primary")
+    return options
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections so pool utilization can be reported."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkout_failures = 0
+        self.created_total = 0
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+            self.created_total += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    # Remaining pool events carry nothing we report on
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+
+class Database:
+    """Lazily created Motor client; attribute and item access fall through to the configured database."""
+
+    def __init__(self, url: Optional[str] = None, name: Optional[str] = None):
+        self.url = url or os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+        self.name = name or os.getenv("MONGODB_DB", "student_marksheet_db")
+        self.listeners: list = []
+        self.pool_stats = PoolStatsListener()
+        self.options = client_options()
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = AsyncIOMotorClient(
+                self.url, event_listeners=[self.pool_stats, *self.listeners], **self.options
+            )
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.name]
+
+    def use(self, client):
+        """Swap in an already constructed client (e.g. a mock in the benchmark harness)."""
+        self._client = client
+
+    def after_fork(self):
+        # Never reuse a parent's client in a forked worker: drop it (without closing the
+        # parent's sockets) so the worker builds its own on first use
+        self._client = None
+        self.pool_stats = PoolStatsListener()
+
+    async def connect(self, warmup_connections: Optional[int] = None):
+        # Open connections concurrently so the first requests don't pay for the handshakes
+        count = warmup_connections
+        if count is None:
+            count = int(os.getenv("MONGODB_WARMUP_CONNECTIONS", "0")) or self.options.get("minPoolSize", 0)
+        await asyncio.gather(*(self.client.admin.command("ping") for _ in range(max(1, count))))
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def stats(self) -> dict:
+        max_pool_size = self.options.get("maxPoolSize") or 0
+        return {
+            "max_pool_size": max_pool_size,
+            "min_pool_size": self.options.get("minPoolSize", 0),
+            "open_connections": self.pool_stats.open,
+            "checked_out": self.pool_stats.checked_out,
+            "max_checked_out": self.pool_stats.max_checked_out,
+            "utilization": self.pool_stats.checked_out / max_pool_size if max_pool_size else 0.0,
+            "checkout_failures": self.pool_stats.checkout_failures,
+            "connections_created": self.pool_stats.created_total,
+        }
+
+    def __getattr__(self, name):
+        # Only reached for names not defined above, i.e. collections and database methods
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.db, name)
+
+    def __getitem__(self, name):
+        return self.db[name]
+
+
+database = Database()
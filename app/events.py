@@ -0,0 +1,202 @@
+# /backend/app/events.py
+#
+# In-process fan-out of student and mark changes to Server-Sent Events clients.
+#
+# Write handlers publish small deltas ({"op": "insert"|"update"|"delete", "doc": ...})
+# tagged with the classes they touch; each subscriber gets them through its own
+# bounded queue, optionally filtered to a set of classes. Publishing never waits
+# on a slow client: when a subscriber's queue is full its backlog is dropped and it
+# receives a single "resync" event telling it to reload instead of patching.
+#
+# With several workers, changes travel between them through a small capped
+# collection that each worker tails (EVENT_FANOUT=mongodb, the default); a
+# single-worker deployment can skip that write with EVENT_FANOUT=process.
+
+from typing import AsyncIterator, Callable, Iterable, Optional
+import asyncio
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+import orjson
+
+EVENT_LOG_COLLECTION = "change_events"
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    def __init__(self, class_names: Optional[Iterable[str]], maxsize: int):
+        self.class_names = set(class_names) if class_names else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def wants(self, class_names: set) -> bool:
+        return self.class_names is None or not class_names or bool(self.class_names & class_names)
+
+    def offer(self, event: Optional[dict]) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Too far behind to catch up by patching; replace the backlog with a reload request
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None if event is None else RESYNC)
+            return False
+
+    async def get(self) -> Optional[dict]:
+        return await self.queue.get()
+
+
+def change(kind: str, op: str, doc: dict, class_names: Iterable[Optional[str]] = ()) -> dict:
+    return {"type": kind, "op": op, "doc": doc, "classes": sorted({name for name in class_names if name})}
+
+
+class EventHub:
+    """Fans changes out to this process's subscribers.
+
+    With a database, published changes go through a capped collection that every
+    worker tails, so a client sees changes whichever worker made them; without one
+    (or until start() has the tail running) they are dispatched directly and stay
+    within this process.
+    """
+
+    def __init__(self, queue_size: int = 1000, db=None, log_size_bytes: int = 16 * 1024 * 1024):
+        self.queue_size = queue_size
+        self.db = db
+        self.log_size_bytes = log_size_bytes
+        self.subscribers: set[Subscription] = set()
+        self.published = 0
+        self.overflows = 0
+        self._follower: Optional[asyncio.Task] = None
+
+    @property
+    def log(self):
+        return self.db[EVENT_LOG_COLLECTION]
+
+    def subscribe(self, class_names: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(class_names, self.queue_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    async def publish(self, *changes: dict):
+        if not changes:
+            return
+        self.published += len(changes)
+        # Not through the log before start(): nothing here would read it back, and an
+        # insert would create the collection uncapped
+        if self.db is None or self._follower is None:
+            for event in changes:
+                self._dispatch(event)
+        else:
+            await self.log.insert_many([dict(event) for event in changes], ordered=True)
+
+    def _dispatch(self, event: dict):
+        classes = set(event.get("classes") or ())
+        payload = {"type": event["type"], "op": event.get("op"), "doc": event.get("doc")}
+        for subscription in list(self.subscribers):
+            if subscription.wants(classes) and not subscription.offer(payload):
+                self.overflows += 1
+
+    def _resync_all(self):
+        for subscription in list(self.subscribers):
+            subscription.offer(RESYNC)
+
+    async def start(self):
+        if self.db is None or self._follower is not None:
+            return
+        try:
+            await self.db.create_collection(EVENT_LOG_COLLECTION, capped=True, size=self.log_size_bytes)
+        except CollectionInvalid:
+            # Already created, normally by another worker; tailing needs it capped
+            if not (await self.log.options()).get("capped"):
+                await self.db.command("convertToCapped", EVENT_LOG_COLLECTION, size=self.log_size_bytes)
+        self._follower = asyncio.create_task(self._follow())
+
+    async def _follow(self):
+        last_id = None
+        positioned = False
+        while True:
+            try:
+                if not positioned:
+                    # Start after the newest entry; older changes are already in what clients load
+                    last_id = await self._newest_id()
+                    positioned = True
+                elif last_id is not None and await self.log.find_one({"_id": last_id}, {"_id": 1}) is None:
+                    # The capped log wrapped past our position; clients must reload
+                    self._resync_all()
+                    last_id = await self._newest_id()
+                # Resume in natural (insertion) order, skipping up to our position. Not by
+                # {"_id": {"$gt": last_id}}: ObjectIds from different workers within the same
+                # second aren't ordered by insertion, so that would drop some of their events.
+                # Re-reading the (small) log only happens when a tail is restarted.
+                skipping = last_id is not None
+                async for event in self.log.find({}, cursor_type=CursorType.TAILABLE_AWAIT):
+                    if skipping:
+                        skipping = event["_id"] != last_id
+                        continue
+                    last_id = event["_id"]
+                    self._dispatch(event)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                # Typically the capped log wrapped past our position; clients must reload
+                print(f"Error following change log: {str(e)}")
+                if positioned:
+                    self._resync_all()
+            # An empty log (or a killed cursor) ends the tail; poll until there is something to follow
+            await asyncio.sleep(0.5)
+
+    async def _newest_id(self):
+        newest = await self.log.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+        return newest["_id"] if newest else None
+
+    def close(self):
+        if self._follower is not None:
+            self._follower.cancel()
+            self._follower = None
+        # Ends every open stream; None is the stop sentinel
+        for subscription in list(self.subscribers):
+            subscription.offer(None)
+
+    def stats(self) -> dict:
+        return {
+            "fanout": "process" if self.db is None else "mongodb",
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+            "max_queue_depth": max((s.queue.qsize() for s in self.subscribers), default=0),
+        }
+
+
+async def sse_stream(
+    hub: EventHub,
+    subscription: Subscription,
+    is_disconnected: Callable,
+    keepalive_seconds: float = 15.0,
+) -> AsyncIterator[bytes]:
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=keepalive_seconds)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                # Comment line; keeps proxies from closing an idle connection
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            yield b"event: " + event["type"].encode() + b"\ndata: " + orjson.dumps(event) + b"\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def event_doc(doc: dict) -> dict:
+    # ObjectIds (the _id, mostly) as strings; orjson handles the datetimes
+    return {key: str(value) if isinstance(value, ObjectId) else value for key, value in doc.items()}
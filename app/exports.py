@@ -0,0 +1,57 @@
+# /backend/app/exports.py
+from bson import ObjectId
+from datetime import datetime
+from typing import AsyncIterator
+import csv
+import io
+import json
+
+FLUSH_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+STUDENT_EXPORT_FIELDS = ["_id", "name", "roll_number", "class_name", "section"]
+MARKS_EXPORT_FIELDS = ["_id", "student_id", "student_name", "subject", "marks", "max_marks", "exam_date"]
+
+
+def _export_value(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def ndjson_rows(cursor, fields: list[str]) -> AsyncIterator[bytes]:
+    # Motor fetches batch_size documents per round trip; output is flushed in ~64KB pieces
+    buffer = io.StringIO()
+    async for doc in cursor:
+        buffer.write(json.dumps({field: _export_value(doc.get(field)) for field in fields}))
+        buffer.write("\n")
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def csv_rows(cursor, fields: list[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for doc in cursor:
+        writer.writerow([_export_value(doc.get(field)) for field in fields])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_rows(cursor, fields: list[str], fmt: str) -> AsyncIterator[bytes]:
+    return csv_rows(cursor, fields) if fmt == "csv" else ndjson_rows(cursor, fields)
@@ -0,0 +1,184 @@
+# /backend/app/indexes.py
+#
+# Index definitions for the hot query paths in app/main.py, plus an
+# explain-based check that none of those queries falls back to a COLLSCAN.
+#
+#   python -m app.indexes            # create indexes
+#   python -m app.indexes --check    # create indexes, then fail on any COLLSCAN
+
+from datetime import datetime
+from typing import Optional
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+import asyncio
+import sys
+
+INDEX_OPTIONS_CONFLICT = (85, 86)  # An index of that name or key exists with other options
+DUPLICATE_KEY = 11000
+DUPLICATES_REPORTED = 10  # Duplicate keys listed when they block a unique index
+
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "students": [
+        IndexModel([("roll_number", ASCENDING)], name="roll_number_unique", unique=True),
+        IndexModel([("class_name", ASCENDING), ("section", ASCENDING)], name="class_section"),
+    ],
+    "marks": [
+        # One mark per student, subject and exam date (the bulk sheet upserts on this key);
+        # also serves every lookup on student_id alone (per-student marks, deletes, $lookup joins)
+        IndexModel(
+            [("student_id", ASCENDING), ("subject", ASCENDING), ("exam_date", ASCENDING)],
+            name="student_subject_exam_date",
+            unique=True,
+        ),
+        IndexModel([("subject", ASCENDING), ("exam_date", ASCENDING)], name="subject_exam_date"),
+        # Date ranges on their own: term reports and the archival batches
+        IndexModel([("exam_date", ASCENDING)], name="exam_date"),
+    ],
+    "report_snapshots": [
+        IndexModel([("stale", ASCENDING)], name="stale", partialFilterExpression={"stale": True}),
+    ],
+    "marksheet_jobs": [
+        # Progress records only need to outlive the download
+        IndexModel([("started_at", ASCENDING)], name="started_at_ttl", expireAfterSeconds=24 * 60 * 60),
+    ],
+}
+
+# Indexes earlier versions created that no query uses any more
+OBSOLETE_INDEXES = {
+    "report_snapshots": ["kind_average"],  # For per-student snapshots, replaced by app/ranking.py
+}
+
+# Representative query shapes issued by the endpoints, keyed by a readable label
+SAMPLE_ROLL = "__explain__"
+SAMPLE_DATE = datetime(2000, 1, 1)
+ENDPOINT_QUERIES = {
+    "get_current_user: users by username": {"find": "users", "filter": {"username": SAMPLE_ROLL}},
+    "list_students": {"find": "students", "filter": {}, "sort": {"_id": 1}, "limit": 100},
+    "list_students: class filter": {
+        "find": "students", "filter": {"class_name": "X", "section": "A"}, "sort": {"_id": 1}, "limit": 100
+    },
+    "get_student: students by roll_number": {"find": "students", "filter": {"roll_number": SAMPLE_ROLL}},
+    "get_student_marks: marks by student_id": {"find": "marks", "filter": {"student_id": SAMPLE_ROLL}},
+    "list_marks": {"find": "marks", "filter": {}, "sort": {"_id": 1}, "limit": 100},
+    "list_marks: subject and date filter": {
+        "find": "marks", "filter": {"subject": "X", "exam_date": {"$gte": SAMPLE_DATE}}
+    },
+    "add_marks_bulk: upsert key": {
+        "find": "marks", "filter": {"student_id": SAMPLE_ROLL, "subject": "X", "exam_date": SAMPLE_DATE}
+    },
+    "get_term_subject_performance: hot marks in a term": {
+        "find": "marks", "filter": {"exam_date": {"$gte": SAMPLE_DATE, "$lt": SAMPLE_DATE}}
+    },
+    "MarksArchive.run: marks before the cutoff": {
+        "find": "marks", "filter": {"exam_date": {"$lt": SAMPLE_DATE}}, "sort": {"_id": 1}, "limit": 1000
+    },
+}
+
+
+async def ensure_indexes(db) -> list[str]:
+    """Create every index in INDEXES, returning errors instead of raising so startup can continue."""
+    errors = []
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure:
+            # One at a time, so an index that can't be built (duplicates under a unique key,
+            # an older definition) doesn't keep the rest of the collection's from being created
+            for index in indexes:
+                error = await _replace_index(db[collection], index)
+                if error is None:
+                    continue
+                errors.append(f"{collection}: {error}")
+                if error.code == DUPLICATE_KEY:
+                    errors += [
+                        f"{collection}: {index.document['name']} blocked by duplicate key {key} ({count} documents)"
+                        for key, count in await duplicate_keys(db[collection], index)
+                    ]
+    for collection, names in OBSOLETE_INDEXES.items():
+        existing = set(await db[collection].index_information())
+        for name in existing.intersection(names):
+            await db[collection].drop_index(name)
+    return errors
+
+
+async def duplicate_keys(collection, index: IndexModel, limit: int = DUPLICATES_REPORTED) -> list[tuple[dict, int]]:
+    """Up to limit keys of index shared by more than one document, with how many share each."""
+    fields = list(index.document["key"])
+    pipeline = [
+        {"$group": {"_id": {field.replace(".", "_"): f"${field}" for field in fields}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+    ]
+    return [(doc["_id"], doc["count"]) async for doc in collection.aggregate(pipeline, allowDiskUse=True)]
+
+
+async def _replace_index(collection, index: IndexModel) -> Optional[OperationFailure]:
+    """Create index, replacing an older definition under the same name (e.g. one that wasn't unique yet)."""
+    try:
+        await collection.create_indexes([index])
+        return None
+    except OperationFailure as e:
+        if e.code not in INDEX_OPTIONS_CONFLICT:
+            return e
+    name = index.document["name"]
+    previous = (await collection.index_information())[name]
+    await collection.drop_index(name)
+    try:
+        await collection.create_indexes([index])
+        return None
+    except OperationFailure as e:
+        # Most likely existing duplicates; keep the old definition until they are cleaned up
+        options = {key: value for key, value in previous.items() if key not in ("key", "v", "ns")}
+        await collection.create_index(previous["key"], name=name, **options)
+        return e
+
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+async def find_collscans(db) -> list[str]:
+    """Return the labels of endpoint queries whose winning plan contains a COLLSCAN."""
+    offenders = []
+    for label, command in ENDPOINT_QUERIES.items():
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _stages(winning_plan):
+            offenders.append(label)
+    return offenders
+
+
+async def main(check: bool) -> int:
+    from app.database import database as db
+
+    errors = await ensure_indexes(db)
+    for error in errors:
+        print(f"Failed to create index on {error}")
+    status = 1 if errors else 0
+
+    if check:
+        offenders = await find_collscans(db)
+        for label in offenders:
+            print(f"COLLSCAN: {label}")
+        if offenders:
+            status = 1
+        else:
+            print(f"All {len(ENDPOINT_QUERIES)} endpoint queries use an index")
+
+    db.close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--check" in sys.argv[1:])))
@@ -1,26 +1,83 @@
 # /backend/app/main.py
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi import Request
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from pydantic import BaseModel
-from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import BaseModel, ValidationError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from bson import ObjectId
+from bson.errors import InvalidId
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import binascii
 import os
+import time
 from dotenv import load_dotenv
 
+from app.analytics import GROUP_BY, VALUES, MarksAnalytics
+from app.archive import MarksArchive, term_bounds
+from app.assets import CachedStaticFiles, template_directory
+from app.cache import TTLCache
+from app.cascade import OrphanCompactor, delete_students
+from app.compression import CompressionMiddleware
+from app.events import EventHub, change, event_doc, sse_stream
+from app.database import database
+from app.hashing import PasswordHasher
+from app.exports import MARKS_EXPORT_FIELDS, MEDIA_TYPES, STUDENT_EXPORT_FIELDS, export_rows
+from app.indexes import ensure_indexes
+from app.marksheets import MarksheetRenderer, pdf_available, safe_filename
+from app.metrics import CommandListener, MetricsMiddleware, render_metrics
+from app.names import StudentNames
+from app.ranking import OVERALL, RankingEngine
+from app.reports import ReportSnapshots, subject_stats, summarize_subjects
+from app.students import StudentResolver
+from app.summary import build_summary, student_summary_pipeline
+from app.uploads import iter_upload_rows
+from app.versions import CollectionVersions, etag_matches, version_etag
+
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The Motor client is opened here rather than at import, so each worker process gets its own
+    try:
+        await database.connect()
+        for error in await ensure_indexes(db):
+            print(f"Failed to create index on {error}")
+        await report_snapshots.rebuild_if_empty()
+        await rankings.load()
+    except Exception as e:
+        print(f"Error during database startup: {str(e)}")
+    # Separately, so the change log is set up (capped) even when an earlier step failed
+    try:
+        await events.start()
+    except Exception as e:
+        print(f"Error starting change event fan-out: {str(e)}")
+    compaction = None
+    if ORPHAN_COMPACTION_INTERVAL_SECONDS > 0:
+        compaction = asyncio.create_task(orphan_compactor.run_every(ORPHAN_COMPACTION_INTERVAL_SECONDS))
+    yield
+    if compaction is not None:
+        compaction.cancel()
+    events.close()
+    marksheets.shutdown()
+    password_hasher.shutdown()
+    database.close()
+
 # FastAPI app initialization
-app = FastAPI(title="Student Marksheet Management System")
+app = FastAPI(
+    title="Student Marksheet Management System",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # CORS middleware configuration
 app.add_middleware(
@@ -29,24 +86,115 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag", "X-Job-Id"],
+)
+
+# Request timing and DB command accounting; slow requests and queries are logged
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+app.add_middleware(MetricsMiddleware, slow_request_ms=SLOW_REQUEST_MS)
+command_listener = CommandListener(slow_query_ms=SLOW_QUERY_MS)
+
+# Response compression: encodings in order of preference (br needs the brotli package), "" to disable
+COMPRESSION_ENCODINGS = [e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "br,gzip").split(",") if e.strip()]
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=COMPRESSION_ENCODINGS,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    gzip_level=int(os.getenv("GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("BROTLI_QUALITY", "4")),
+)
+
+# MongoDB connection (shared, lifespan-managed client; see app/database.py)
+database.listeners.append(command_listener)
+db = database
+report_snapshots = ReportSnapshots(db)
+collection_versions = CollectionVersions(db)
+
+# Live change feed for open dashboards (GET /events)
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+EVENT_KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+EVENT_FANOUT = os.getenv("EVENT_FANOUT", "mongodb")  # "process" when running a single worker
+EVENT_LOG_BYTES = int(os.getenv("EVENT_LOG_BYTES", str(16 * 1024 * 1024)))
+events = EventHub(
+    queue_size=EVENT_QUEUE_SIZE,
+    db=db if EVENT_FANOUT == "mongodb" else None,
+    log_size_bytes=EVENT_LOG_BYTES,
 )
 
-# MongoDB connection
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGODB_URL)
-db = client.student_marksheet_db
+# In-memory leaderboards; reloaded periodically to pick up other workers' writes
+RANKING_REFRESH_SECONDS = float(os.getenv("RANKING_REFRESH_SECONDS", "300"))
+rankings = RankingEngine(db, refresh_seconds=RANKING_REFRESH_SECONDS)
+
+# Column arrays of every mark for /analytics/*; loaded on first use, reloaded like the leaderboards
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "300"))
+analytics = MarksAnalytics(db, refresh_seconds=ANALYTICS_REFRESH_SECONDS)
 
 # Security configurations
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authenticated principals are cached per token so hot endpoints skip the users lookup
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+# Student result summaries are cached per roll number and the shared marks/students
+# versions, so a write on any worker retires them; a mark change in a class also
+# drops that whole class's entries here right away, since classmates' ranks move with it
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "10000"))
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "300"))
+summary_cache = TTLCache(maxsize=SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_TTL_SECONDS)
+
+# Student names for labelling marks, fetched one batch per page instead of a $lookup per mark
+STUDENT_NAME_CACHE_SIZE = int(os.getenv("STUDENT_NAME_CACHE_SIZE", "50000"))
+STUDENT_NAME_CACHE_TTL_SECONDS = float(os.getenv("STUDENT_NAME_CACHE_TTL_SECONDS", "60"))
+student_names = StudentNames(db, maxsize=STUDENT_NAME_CACHE_SIZE, ttl=STUDENT_NAME_CACHE_TTL_SECONDS)
+
+# Student documents by ObjectId and roll number for GET /students/{student_id}, valid
+# for one students version; write handlers look students up uncached
+STUDENT_CACHE_SIZE = int(os.getenv("STUDENT_CACHE_SIZE", "10000"))
+STUDENT_CACHE_TTL_SECONDS = float(os.getenv("STUDENT_CACHE_TTL_SECONDS", "60"))
+student_resolver = StudentResolver(db, maxsize=STUDENT_CACHE_SIZE, ttl=STUDENT_CACHE_TTL_SECONDS)
+
+# Pagination configuration
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Exports stream from a cursor fetching this many documents per round trip
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+MAX_EXPORT_BATCH_SIZE = 10000
+
+# Bulk imports are validated and written in chunks of this many rows
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+# Marks from finished terms can be moved out of the hot collection (see app/archive.py)
+MARKS_ARCHIVE_DIRECTORY = os.getenv("MARKS_ARCHIVE_DIRECTORY", "archive")
+
+# Periodic cleanup of marks whose student no longer exists; 0 leaves it to POST /maintenance/orphaned-marks
+ORPHAN_COMPACTION_INTERVAL_SECONDS = float(os.getenv("ORPHAN_COMPACTION_INTERVAL_SECONDS", "0"))
+
+# Class marksheets are rendered in a process pool, a few students ahead of the ZIP being sent
+marksheets = MarksheetRenderer(
+    db,
+    workers=int(os.getenv("MARKSHEET_WORKERS", "0")) or None,
+    max_in_flight=int(os.getenv("MARKSHEET_MAX_IN_FLIGHT", "0")) or None,
+)
+
+# bcrypt runs in a bounded worker pool so logins never block the event loop
+password_hasher = PasswordHasher(
+    mode=os.getenv("PASSWORD_HASH_EXECUTOR", "thread"),
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None,
+    max_concurrency=int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", "0")) or None,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# Fingerprinted assets from `python -m app.assets` are cached for good; templates/dist points at them
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+templates = Jinja2Templates(directory=template_directory())
 
 # Models
 class User(BaseModel):
@@ -80,12 +228,18 @@ class Marks(BaseModel):
     max_marks: float
     exam_date: datetime
 
+class ExamSheet(BaseModel):
+    subject: str
+    max_marks: float
+    exam_date: datetime
+    marks: dict[str, float]  # roll_number -> marks obtained
+
 # Security functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 async def get_user(username: str):
     user_dict = await db.users.find_one({"username": username})
@@ -97,7 +251,7 @@ async def authenticate_user(username: str, password: str):
     user = await get_user(username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -111,7 +265,95 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Pagination helpers
+def encode_cursor(last_id) -> str:
+    # Opaque cursor: url-safe base64 of the last _id seen on the page
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return ObjectId(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, InvalidId, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def apply_cursor(query: dict, cursor: Optional[str]) -> dict:
+    if cursor:
+        query["_id"] = {"$gt": decode_cursor(cursor)}
+    return query
+
+def set_next_cursor(response: Response, page: list, limit: int):
+    # A full page means there may be more; the client follows X-Next-Cursor until it is absent.
+    # page[-1]["_id"] may already be a string when it was projected with $toString
+    if len(page) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1]["_id"])
+
+def invalidate_user_cache(username: str):
+    # Drop every cached token for this user so the next request re-reads the users collection
+    user_cache.invalidate_where(lambda token, user: user.username == username)
+
+def invalidate_summaries(*students):
+    # Class rank depends on every classmate's marks, so invalidate by class
+    class_names = {student["class_name"] for student in students if student}
+    if class_names:
+        summary_cache.invalidate_where(lambda key, summary: summary["class_name"] in class_names)
+
+# Projections that render _id as a string inside MongoDB, so list endpoints can hand
+# documents straight to orjson without a Python pass over every document
+STUDENT_PROJECTION = {
+    "_id": {"$toString": "$_id"},
+    "name": 1,
+    "roll_number": 1,
+    "class_name": 1,
+    "section": 1,
+    "subjects": 1,
+}
+MARKS_PROJECTION = {
+    "_id": {"$toString": "$_id"},
+    "student_id": 1,
+    "subject": 1,
+    "marks": 1,
+    "max_marks": 1,
+    "exam_date": 1,
+}
+
+# Filters shared by the listing and export endpoints
+def student_filter(class_name: Optional[str], section: Optional[str]) -> dict:
+    query = {}
+    if class_name:
+        query["class_name"] = class_name
+    if section:
+        query["section"] = section
+    return query
+
+async def marks_filter(
+    class_name: Optional[str],
+    section: Optional[str],
+    subject: Optional[str],
+    exam_date_from: Optional[datetime],
+    exam_date_to: Optional[datetime],
+) -> dict:
+    match = {}
+    # Class/section live on students, so resolve them to roll numbers up front
+    # and every filter runs in the one marks query
+    if class_name or section:
+        roll_numbers = await db.students.distinct("roll_number", student_filter(class_name, section))
+        match["student_id"] = {"$in": roll_numbers}
+    if subject:
+        match["subject"] = subject
+    if exam_date_from or exam_date_to:
+        match["exam_date"] = {}
+        if exam_date_from:
+            match["exam_date"]["$gte"] = exam_date_from
+        if exam_date_to:
+            match["exam_date"]["$lte"] = exam_date_to
+    return match
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    cached_user = user_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -128,8 +370,113 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     user = await get_user(username=token_data.username)
     if user is None:
         raise credentials_exception
+
+    # Never keep a principal around longer than its token is valid
+    expires_at = payload.get("exp")
+    ttl = expires_at - time.time() if expires_at else None
+    if ttl is None or ttl > 0:
+        user_cache.set(token, user, ttl=ttl)
     return user
 
+def conditional(*collections: str):
+    """Dependency for GET endpoints whose response depends only on the given collections."""
+    async def check(request: Request, response: Response, current_user: User = Depends(get_current_user)) -> dict:
+        # Scoped to the caller as well, so a 304 can never stand in for an authorization check
+        versions = await collection_versions.current(collections)
+        etag = version_etag(versions, app.version, current_user.username, request.url.path, request.url.query)
+        # Kept for handlers that cache per process, so their entries follow writes made on other workers
+        request.state.versions = versions
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return headers
+    return check
+
+# Everything derived from students and marks (report snapshots, ETag versions, caches,
+# rankings, live events) is brought up to date here once a write has landed
+async def students_added(*students: dict):
+    await report_snapshots.students_added(*students)
+    versions = await collection_versions.bump("students")
+    rankings.students_added(*students)
+    analytics.students_added(*students)
+    # Only now do the engines reflect this write; counting it any earlier would let a
+    # load that raced it pass for current
+    rankings.advance(versions)
+    analytics.advance(versions)
+    student_names.invalidate(*(student["roll_number"] for student in students))
+    await events.publish(*(
+        change("student", "insert", event_doc(student), [student["class_name"]]) for student in students
+    ))
+
+async def student_updated(old: dict, new: dict):
+    await report_snapshots.students_changed(old, new)
+    await collection_versions.bump("students")
+    invalidate_summaries(old, new)
+    student_names.invalidate(old["roll_number"], new["roll_number"])
+    student_resolver.invalidate(old, new)
+    rankings.students_changed()
+    analytics.invalidate()
+    await events.publish(change("student", "update", event_doc(new), [old["class_name"], new["class_name"]]))
+
+async def students_deleted(students: list[dict], subjects: list):
+    """After a cascade delete: the students, their marks (in subjects) and their logins are gone."""
+    await report_snapshots.subjects_changed(subjects)
+    await report_snapshots.students_changed(*students)
+    await collection_versions.bump("students", "marks")
+    invalidate_summaries(*students)
+    student_names.invalidate(*(student["roll_number"] for student in students))
+    student_resolver.invalidate(*students)
+    for student in students:
+        invalidate_user_cache(student["roll_number"])
+    rankings.students_changed()
+    analytics.invalidate()
+    await events.publish(*(
+        change("student", "delete", event_doc(student), [student["class_name"]]) for student in students
+    ))
+
+async def orphaned_marks_removed(subjects: list):
+    # Orphans only ever counted towards subject snapshots
+    await report_snapshots.subjects_changed(subjects)
+    analytics.invalidate()
+
+orphan_compactor = OrphanCompactor(db, on_removed=orphaned_marks_removed)
+
+async def marks_archived(marks: list[dict]):
+    # Archived marks leave every hot aggregate as if deleted; no change events, since
+    # the terms they belong to are over and dashboards only page through recent marks
+    roll_numbers = list({mark["student_id"] for mark in marks})
+    students = await db.students.find({"roll_number": {"$in": roll_numbers}}).to_list(length=None)
+    await report_snapshots.subjects_changed({mark["subject"] for mark in marks})
+    await report_snapshots.students_changed(*students)
+    invalidate_summaries(*students)
+    rankings.students_changed()
+    analytics.invalidate()
+
+marks_archive = MarksArchive(db, directory=MARKS_ARCHIVE_DIRECTORY, on_archived=marks_archived)
+
+async def marks_changed(changes: list[tuple[Optional[dict], Optional[dict]]], students: dict):
+    """(old_mark, new_mark) pairs as in ReportSnapshots.marks_changed; students maps roll_number to student."""
+    await report_snapshots.marks_changed(changes, students)
+    versions = await collection_versions.bump("marks")
+    rankings.marks_changed(changes)
+    analytics.marks_changed(changes)
+    rankings.advance(versions)
+    analytics.advance(versions)
+    invalidate_summaries(*students.values())
+    deltas = []
+    for old_mark, new_mark in changes:
+        mark = new_mark if new_mark is not None else old_mark
+        op = "delete" if new_mark is None else "insert" if old_mark is None else "update"
+        student = students.get(mark["student_id"])
+        classes = [students[m["student_id"]]["class_name"] for m in (old_mark, new_mark) if m and m["student_id"] in students]
+        deltas.append(change(
+            "mark", op,
+            event_doc({**mark, "student_name": student["name"] if student else "Unknown Student"}),
+            classes,
+        ))
+    await events.publish(*deltas)
+
 # Routes
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
@@ -160,24 +507,39 @@ async def get_user_details(username: str, current_user: User = Depends(get_curre
     return user
 
 @app.get("/marks/by-roll/{roll_number}")
-async def get_student_marks_by_roll(roll_number: str, current_user: User = Depends(get_current_user)):
+async def get_student_marks_by_roll(
+    roll_number: str,
+    include_archived: bool = False,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks")),
+):
     if current_user.role == "student" and current_user.username != roll_number:
         raise HTTPException(status_code=403, detail="Not authorized to view these marks")
     
-    marks = await db.marks.find({"student_id": roll_number}).to_list(length=None)
-    # Convert ObjectId to string for each mark
-    for mark in marks:
-        mark["_id"] = str(mark["_id"])
-    return marks
+    marks = await db.marks.find({"student_id": roll_number}, MARKS_PROJECTION).to_list(length=None)
+    if include_archived:
+        marks += await marks_archive.find({"student_id": roll_number})
+    return ORJSONResponse(marks, headers=etag_headers)
 
 @app.get("/students/", response_model=list[Student])
-async def list_students(current_user: User = Depends(get_current_user)):
+async def list_students(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    class_name: Optional[str] = None,
+    section: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("students")),
+):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to view all students")
-    students = await db.students.find().to_list(length=None)
-    for student in students:
-        student["_id"] = str(student["_id"])
-    return students
+
+    query = apply_cursor(student_filter(class_name, section), cursor)
+
+    students = await db.students.find(query, STUDENT_PROJECTION).sort("_id", 1).limit(limit).to_list(length=limit)
+    # Documents are already JSON-ready; returning the response directly skips response_model re-validation
+    response = ORJSONResponse(students, headers=etag_headers)
+    set_next_cursor(response, students, limit)
+    return response
 
 @app.post("/students/", response_model=Student)
 async def create_student(student: Student, current_user: User = Depends(get_current_user)):
@@ -190,49 +552,142 @@ async def create_student(student: Student, current_user: User = Depends(get_curr
     student_dict["_id"] = str(result.inserted_id)
     
     # Create user account for the student
-    student_user = {
-        "username": student.roll_number,  # Use roll number as username
-        "email": f"{student.roll_number}@example.com",
-        "full_name": student.name,
-        "role": "student",
-        "disabled": False,
-        "hashed_password": pwd_context.hash(student.roll_number)  # Use roll number as initial password
-    }
+    student_user = new_student_user(
+        student, await get_password_hash(student.roll_number)  # Use roll number as initial password
+    )
     
     # Check if user already exists
     existing_user = await db.users.find_one({"username": student.roll_number})
     if not existing_user:
         await db.users.insert_one(student_user)
-    
+        invalidate_user_cache(student.roll_number)
+
+    await students_added(student_dict)
     return student_dict
 
+def new_student_user(student: Student, hashed_password: str) -> dict:
+    return {
+        "username": student.roll_number,  # Use roll number as username
+        "email": f"{student.roll_number}@example.com",
+        "full_name": student.name,
+        "role": "student",
+        "disabled": False,
+        "hashed_password": hashed_password
+    }
+
+async def import_student_chunk(chunk: list[tuple[int, Student]], errors: list[dict]) -> int:
+    roll_numbers = [student.roll_number for _, student in chunk]
+
+    # One query per chunk to skip roll numbers that are already taken
+    existing = set(await db.students.distinct("roll_number", {"roll_number": {"$in": roll_numbers}}))
+    pending = []
+    for line_number, student in chunk:
+        if student.roll_number in existing:
+            errors.append({"row": line_number, "roll_number": student.roll_number, "error": "Student with this roll number already exists"})
+        else:
+            pending.append((line_number, student))
+    if not pending:
+        return 0
+
+    docs = [student.dict() for _, student in pending]
+    failed_indexes = set()
+    try:
+        await db.students.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            failed_indexes.add(write_error["index"])
+            line_number, student = pending[write_error["index"]]
+            errors.append({"row": line_number, "roll_number": student.roll_number, "error": write_error.get("errmsg", "Write failed")})
+    inserted = [student for i, (_, student) in enumerate(pending) if i not in failed_indexes]
+    if not inserted:
+        return 0
+    await students_added(*(doc for i, doc in enumerate(docs) if i not in failed_indexes))
+
+    # Create the matching user accounts, hashing initial passwords in parallel on the hasher pool
+    existing_users = set(await db.users.distinct("username", {"username": {"$in": [s.roll_number for s in inserted]}}))
+    new_users = [student for student in inserted if student.roll_number not in existing_users]
+    hashes = await asyncio.gather(*(get_password_hash(student.roll_number) for student in new_users))
+    if new_users:
+        try:
+            await db.users.insert_many(
+                [new_student_user(student, hashed) for student, hashed in zip(new_users, hashes)],
+                ordered=False,
+            )
+        except BulkWriteError:
+            # A concurrent create already made the account; the student record is still valid
+            pass
+        for student in new_users:
+            invalidate_user_cache(student.roll_number)
+    return len(inserted)
+
+@app.post("/students/bulk")
+async def bulk_import_students(request: Request, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to create students")
+
+    errors = []
+    inserted = 0
+    total_rows = 0
+    seen = set()
+    chunk = []
+    async for line_number, row, error in iter_upload_rows(request):
+        total_rows += 1
+        if error:
+            errors.append({"row": line_number, "error": error})
+            continue
+        row.setdefault("subjects", {})
+        try:
+            student = Student(**row)
+        except ValidationError as e:
+            errors.append({"row": line_number, "roll_number": row.get("roll_number"), "error": str(e)})
+            continue
+        if student.roll_number in seen:
+            errors.append({"row": line_number, "roll_number": student.roll_number, "error": "Duplicate roll number in upload"})
+            continue
+        seen.add(student.roll_number)
+        chunk.append((line_number, student))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            inserted += await import_student_chunk(chunk, errors)
+            chunk = []
+    if chunk:
+        inserted += await import_student_chunk(chunk, errors)
+
+    errors.sort(key=lambda e: e["row"])
+    return {"total_rows": total_rows, "inserted": inserted, "failed": len(errors), "errors": errors}
+
+@app.get("/students/{roll_number}/summary")
+async def get_student_summary(
+    roll_number: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks", "students")),
+):
+    if current_user.role == "student" and current_user.username != roll_number:
+        raise HTTPException(status_code=403, detail="Not authorized to view this student")
+
+    versions = request.state.versions
+    key = (roll_number, versions["marks"], versions["students"])
+    summary = summary_cache.get(key)
+    if summary is None:
+        docs = await db.students.aggregate(student_summary_pipeline(roll_number)).to_list(length=1)
+        if not docs:
+            raise HTTPException(status_code=404, detail="Student not found")
+        summary = build_summary(docs[0])
+        summary_cache.set(key, summary)
+    return summary
+
 @app.get("/students/{student_id}", response_model=Student)
-async def get_student(student_id: str, current_user: User = Depends(get_current_user)):
+async def get_student(
+    student_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("students")),
+):
     if not student_id or student_id == "undefined":
         raise HTTPException(status_code=400, detail="Student ID is required")
-        
-    try:
-        student = None
-        # First try to find by MongoDB ID
-        if len(student_id) == 24:  # Length of MongoDB ObjectId
-            try:
-                student = await db.students.find_one({"_id": ObjectId(student_id)})
-            except:
-                pass
-                
-        # If not found by ObjectId, try by roll number
-        if student is None:
-            student = await db.students.find_one({"roll_number": student_id})
-            
-        if student is None:
-            raise HTTPException(status_code=404, detail="Student not found")
-            
-        # Convert ObjectId to string
-        student["_id"] = str(student["_id"])
-        return student
-    except Exception as e:
-        raise HTTPException(status_code=404, detail=f"Student not found: {str(e)}")
-    
+
+    # Either a MongoDB ID or a roll number
+    student = await student_resolver.resolve(student_id, request.state.versions["students"])
     if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
 
@@ -243,6 +698,77 @@ async def get_student(student_id: str, current_user: User = Depends(get_current_
     student["_id"] = str(student["_id"])
     return student
 
+@app.get("/events")
+async def stream_events(
+    request: Request,
+    class_name: Optional[list[str]] = Query(None),
+    token: Optional[str] = None,
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    # EventSource can't send an Authorization header, so the token may also come as ?token=
+    current_user = await get_current_user(header_token or token or "")
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to subscribe to changes")
+
+    subscription = events.subscribe(class_name)
+    return StreamingResponse(
+        sse_stream(events, subscription, request.is_disconnected, EVENT_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/cache/stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view cache statistics")
+    return {
+        "users": user_cache.stats(),
+        "summaries": summary_cache.stats(),
+        "student_names": student_names.stats(),
+        "students": student_resolver.stats(),
+    }
+
+@app.get("/hashing/stats")
+async def get_hashing_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view hashing statistics")
+    return password_hasher.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    cache_stats = user_cache.stats()
+    summary_stats = summary_cache.stats()
+    hashing_stats = password_hasher.stats()
+    event_stats = events.stats()
+    student_stats = student_resolver.stats()
+    return render_metrics({
+        "user_cache_hits_total": cache_stats["hits"],
+        "user_cache_misses_total": cache_stats["misses"],
+        "user_cache_size": cache_stats["size"],
+        "summary_cache_hits_total": summary_stats["hits"],
+        "summary_cache_misses_total": summary_stats["misses"],
+        "summary_cache_size": summary_stats["size"],
+        "student_cache_hits_total": student_stats["hits"],
+        "student_cache_misses_total": student_stats["misses"],
+        "student_cache_size": student_stats["size"],
+        "student_cache_saved_seconds_total": student_stats["saved_seconds"],
+        "events_subscribers": event_stats["subscribers"],
+        "events_published_total": event_stats["published"],
+        "events_overflows_total": event_stats["overflows"],
+        "password_hash_in_flight": hashing_stats["in_flight"],
+        "password_hash_queue_depth": hashing_stats["queue_depth"],
+        "password_hash_completed_total": hashing_stats["completed"],
+        "marksheet_jobs_running": marksheets.running,
+        "marksheets_rendered_total": marksheets.rendered,
+        **{f"mongodb_pool_{name}": value for name, value in database.stats().items()},
+    })
+
+@app.get("/db/pool-stats")
+async def get_pool_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view database statistics")
+    return database.stats()
+
 @app.get("/test-db")
 async def test_db():
     result = await db["some_collection"].find_one({})
@@ -255,7 +781,7 @@ async def update_student_by_roll(roll_number: str, student: Student, current_use
     
     try:
         # Verify the student exists first
-        existing_student = await db.students.find_one({"roll_number": roll_number})
+        existing_student = await student_resolver.by_roll(roll_number)
         if not existing_student:
             raise HTTPException(status_code=404, detail="Student not found")
         
@@ -270,6 +796,7 @@ async def update_student_by_roll(roll_number: str, student: Student, current_use
         
         # Return updated student data
         updated_student = {**student.dict(), "_id": str(existing_student["_id"])}
+        await student_updated(existing_student, updated_student)
         return updated_student
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to update student: {str(e)}")
@@ -279,22 +806,17 @@ async def delete_student_by_roll(roll_number: str, current_user: User = Depends(
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete students")
     
-    # Find the student first to get their ID
-    student = await db.students.find_one({"roll_number": roll_number})
-    if not student:
+    student = await student_resolver.by_roll(roll_number)
+    if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
-    
-    student_id = str(student["_id"])
-    
-    # Delete student's marks first
-    await db.marks.delete_many({"student_id": student_id})
-    
-    # Then delete the student
-    result = await db.students.delete_one({"roll_number": roll_number})
-    
-    if result.deleted_count == 0:
+
+    # Student, their marks (keyed by roll number) and their login go together
+    removed = await delete_students(db, {"_id": student["_id"]})
+    if not removed["students"]:
+        # Deleted by another request since we looked
         raise HTTPException(status_code=404, detail="Student not found")
-    
+
+    await students_deleted(removed["students"], removed["subjects"])
     return {"message": "Student and related marks deleted successfully"}
 
 @app.put("/students/{student_id}", response_model=Student)
@@ -304,7 +826,7 @@ async def update_student(student_id: str, student: Student, current_user: User =
     
     try:
         # Verify the student exists first
-        existing_student = await db.students.find_one({"_id": ObjectId(student_id)})
+        existing_student = await student_resolver.by_id(student_id)
         if not existing_student:
             raise HTTPException(status_code=404, detail="Student not found")
         
@@ -319,6 +841,7 @@ async def update_student(student_id: str, student: Student, current_user: User =
         
         # Return updated student data
         updated_student = {**student.dict(), "_id": student_id}
+        await student_updated(existing_student, updated_student)
         return updated_student
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to update student: {str(e)}")
@@ -328,44 +851,175 @@ async def delete_student(student_id: str, current_user: User = Depends(get_curre
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete students")
     
-    # Delete student's marks first
-    await db.marks.delete_many({"student_id": student_id})
-    
-    # Then delete the student
-    result = await db.students.delete_one({"_id": ObjectId(student_id)})
-    
-    if result.deleted_count == 0:
+    try:
+        query = {"_id": ObjectId(student_id)}
+    except InvalidId:
         raise HTTPException(status_code=404, detail="Student not found")
-    
+
+    removed = await delete_students(db, query)
+    if not removed["students"]:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    await students_deleted(removed["students"], removed["subjects"])
     return {"message": "Student and related marks deleted successfully"}
 
+@app.delete("/classes/{class_name}")
+async def delete_class(class_name: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to delete students")
+
+    # End-of-year purge: every student in the class, in batches of one transaction each
+    removed = await delete_students(db, {"class_name": class_name})
+    if not removed["students"]:
+        raise HTTPException(status_code=404, detail="Class not found")
+
+    await students_deleted(removed["students"], removed["subjects"])
+    return {
+        "class_name": class_name,
+        "students_deleted": len(removed["students"]),
+        "marks_deleted": removed["marks"],
+        "users_deleted": removed["users"],
+    }
+
+@app.post("/maintenance/orphaned-marks", status_code=202)
+async def compact_orphaned_marks(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to run maintenance")
+
+    started = orphan_compactor.start()
+    return {"started": started, **orphan_compactor.stats()}
+
+@app.get("/maintenance/orphaned-marks")
+async def get_orphan_compaction_status(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to run maintenance")
+    return orphan_compactor.stats()
+
+DUPLICATE_MARKS = "Marks for this student, subject and exam date already exist"
+
 @app.post("/marks/", response_model=Marks)
 async def add_marks(marks: Marks, current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to add marks")
     
     # Verify the student exists
-    student = await db.students.find_one({"roll_number": marks.student_id})
+    student = await student_resolver.by_roll(marks.student_id)
     if not student:
         raise HTTPException(status_code=404, detail=f"Student with roll number {marks.student_id} not found")
     
     marks_dict = marks.dict()
-    result = await db.marks.insert_one(marks_dict)
+    try:
+        result = await db.marks.insert_one(marks_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=DUPLICATE_MARKS)
+    await marks_changed([(None, marks_dict)], {student["roll_number"]: student})
     marks_dict["_id"] = str(result.inserted_id)
     return marks_dict
 
+@app.post("/marks/bulk")
+async def add_marks_bulk(sheet: ExamSheet, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to add marks")
+
+    errors = []
+    valid = {}
+    for roll_number, value in sheet.marks.items():
+        if value < 0 or value > sheet.max_marks:
+            errors.append({"roll_number": roll_number, "error": f"Marks must be between 0 and {sheet.max_marks}"})
+        else:
+            valid[roll_number] = value
+
+    # Resolve every roll number on the sheet with a single query
+    known = {
+        student["roll_number"]: student
+        async for student in db.students.find(
+            {"roll_number": {"$in": list(valid)}}, {"roll_number": 1, "name": 1, "class_name": 1}
+        )
+    }
+    for roll_number in valid:
+        if roll_number not in known:
+            errors.append({"roll_number": roll_number, "error": f"Student with roll number {roll_number} not found"})
+
+    # Existing marks for this sheet, so report snapshots can replace old values rather than add to them
+    existing = {}
+    async for mark in db.marks.find(
+        {"student_id": {"$in": list(known)}, "subject": sheet.subject, "exam_date": sheet.exam_date}
+    ):
+        existing.setdefault(mark["student_id"], []).append(mark)
+    previous = {}
+    for roll_number, marks in existing.items():
+        if len(marks) > 1:
+            # Entered twice before the key was unique; which one to overwrite is anyone's guess
+            errors.append({"roll_number": roll_number, "error": "Duplicate marks exist for this subject and exam date"})
+            del known[roll_number]
+        else:
+            previous[roll_number] = marks[0]
+
+    new_marks = [
+        {
+            "student_id": roll_number,
+            "subject": sheet.subject,
+            "marks": value,
+            "max_marks": sheet.max_marks,
+            "exam_date": sheet.exam_date,
+        }
+        for roll_number, value in valid.items()
+        if roll_number in known
+    ]
+    # Keyed on (student, subject, exam date) so resubmitting the same sheet overwrites instead of duplicating
+    operations = [
+        UpdateOne(
+            {"student_id": mark["student_id"], "subject": mark["subject"], "exam_date": mark["exam_date"]},
+            {"$set": {"marks": mark["marks"], "max_marks": mark["max_marks"]}},
+            upsert=True,
+        )
+        for mark in new_marks
+    ]
+
+    inserted = modified = 0
+    for start in range(0, len(operations), BULK_CHUNK_SIZE):
+        result = await db.marks.bulk_write(operations[start:start + BULK_CHUNK_SIZE], ordered=False)
+        inserted += result.upserted_count
+        modified += result.modified_count
+        for index, upserted_id in result.upserted_ids.items():
+            new_marks[start + index]["_id"] = upserted_id
+
+    for mark in new_marks:
+        if "_id" not in mark and mark["student_id"] in previous:
+            mark["_id"] = previous[mark["student_id"]]["_id"]
+    await marks_changed([(previous.get(mark["student_id"]), mark) for mark in new_marks], known)
+
+    return {
+        "submitted": len(sheet.marks),
+        "inserted": inserted,
+        "updated": modified,
+        "unchanged": len(operations) - inserted - modified,
+        "failed": len(errors),
+        "errors": errors,
+    }
+
 @app.put("/marks/{marks_id}")
 async def update_marks(marks_id: str, marks: Marks, current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to update marks")
     
-    result = await db.marks.update_one(
-        {"_id": ObjectId(marks_id)},
-        {"$set": marks.dict()}
-    )
+    try:
+        previous = await db.marks.find_one_and_update(
+            {"_id": ObjectId(marks_id)},
+            {"$set": marks.dict()},
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=DUPLICATE_MARKS)
     
-    if result.modified_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Marks record not found")
+
+    students = {
+        student["roll_number"]: student
+        async for student in db.students.find({"roll_number": {"$in": [previous["student_id"], marks.student_id]}})
+    }
+    await marks_changed([(previous, {**marks.dict(), "_id": previous["_id"]})], students)
     
     return {"message": "Marks updated successfully"}
 
@@ -374,61 +1028,94 @@ async def delete_marks(marks_id: str, current_user: User = Depends(get_current_u
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete marks")
     
-    result = await db.marks.delete_one({"_id": ObjectId(marks_id)})
+    deleted = await db.marks.find_one_and_delete({"_id": ObjectId(marks_id)})
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Marks record not found")
+
+    student = await student_resolver.by_roll(deleted["student_id"])
+    await marks_changed([(deleted, None)], {student["roll_number"]: student} if student else {})
     
     return {"message": "Marks deleted successfully"}
 
 @app.get("/marks/{student_id}")
-async def get_student_marks(student_id: str, current_user: User = Depends(get_current_user)):
+async def get_student_marks(
+    student_id: str,
+    include_archived: bool = False,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks")),
+):
     if current_user.role == "student" and current_user.username != student_id:
         raise HTTPException(status_code=403, detail="Not authorized to view these marks")
-    marks = await db.marks.find({"student_id": student_id}).to_list(length=None)
-    # Convert ObjectId to string for each mark
-    for mark in marks:
-        mark["_id"] = str(mark["_id"])
-    return marks
+    marks = await db.marks.find({"student_id": student_id}, MARKS_PROJECTION).to_list(length=None)
+    if include_archived:
+        marks += await marks_archive.find({"student_id": student_id})
+    return ORJSONResponse(marks, headers=etag_headers)
 
 @app.get("/marks/")
-async def list_marks(current_user: User = Depends(get_current_user)):
+async def list_marks(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    class_name: Optional[str] = None,
+    section: Optional[str] = None,
+    subject: Optional[str] = None,
+    exam_date_from: Optional[datetime] = None,
+    exam_date_to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks", "students")),
+):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to view all marks")
-    
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "students",
-                "localField": "student_id",
-                "foreignField": "roll_number",  # Use roll_number instead of _id
-                "as": "student_info"
-            }
-        },
-        {
-            "$unwind": {
-                "path": "$student_info",
-                "preserveNullAndEmptyArrays": True  # Keep marks even if student not found
-            }
-        },
-        {
-            "$project": {
-                "_id": 1,
-                "student_id": 1,
-                "subject": 1,
-                "marks": 1,
-                "max_marks": 1,
-                "exam_date": 1,
-                "student_name": {"$ifNull": ["$student_info.name", "Unknown Student"]}
-            }
-        }
-    ]
-    
-    marks = await db.marks.aggregate(pipeline).to_list(None)
-    # Convert ObjectId to string
-    for mark in marks:
-        mark["_id"] = str(mark["_id"])
-    return marks
+
+    match = await marks_filter(class_name, section, subject, exam_date_from, exam_date_to)
+    apply_cursor(match, cursor)
+
+    marks = await db.marks.find(match, MARKS_PROJECTION).sort("_id", 1).limit(limit).to_list(length=limit)
+    await student_names.attach(marks, request.state.versions["students"])
+    response = ORJSONResponse(marks, headers=etag_headers)
+    set_next_cursor(response, marks, limit)
+    return response
+
+@app.get("/export/students")
+async def export_students(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(DEFAULT_EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    class_name: Optional[str] = None,
+    section: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to export students")
+
+    cursor = db.students.find(student_filter(class_name, section)).sort("_id", 1).batch_size(batch_size)
+    return StreamingResponse(
+        export_rows(cursor, STUDENT_EXPORT_FIELDS, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="students.{format}"'},
+    )
+
+@app.get("/export/marks")
+async def export_marks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(DEFAULT_EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    class_name: Optional[str] = None,
+    section: Optional[str] = None,
+    subject: Optional[str] = None,
+    exam_date_from: Optional[datetime] = None,
+    exam_date_to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to export marks")
+
+    match = await marks_filter(class_name, section, subject, exam_date_from, exam_date_to)
+    cursor = db.marks.find(match).sort("_id", 1).batch_size(batch_size)
+    return StreamingResponse(
+        export_rows(student_names.attach_stream(cursor, batch_size), MARKS_EXPORT_FIELDS, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="marks.{format}"'},
+    )
 
 @app.get("/marks/id/{marks_id}")
 async def get_marks_by_id(marks_id: str, current_user: User = Depends(get_current_user)):
@@ -454,154 +1141,232 @@ async def get_marks_by_id(marks_id: str, current_user: User = Depends(get_curren
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error retrieving marks: {str(e)}")
 
+@app.post("/marksheets/{class_name}")
+async def generate_marksheets(
+    class_name: str,
+    format: str = Query("html", pattern="^(html|pdf)$"),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to generate marksheets")
+    if format == "pdf" and not pdf_available():
+        raise HTTPException(status_code=400, detail="PDF marksheets need WeasyPrint installed")
+
+    job = await marksheets.start(class_name, format, current_user.username)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Class not found")
+
+    # The archive streams as marksheets are rendered; poll GET /marksheets/jobs/{X-Job-Id} for progress
+    return StreamingResponse(
+        marksheets.stream(job),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="marksheets_{safe_filename(class_name)}.zip"',
+            "X-Job-Id": job["_id"],
+        },
+    )
+
+@app.get("/marksheets/jobs/{job_id}")
+async def get_marksheet_job(job_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to generate marksheets")
+
+    job = await marksheets.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/reports/class-performance")
-async def get_class_performance(current_user: User = Depends(get_current_user)):
+async def get_class_performance(
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks", "students")),
+):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to view reports")
     
     try:
-        # First get all students grouped by class
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$class_name",
-                    "total_students": {"$sum": 1},
-                    "students": {"$push": {"roll_number": "$roll_number", "name": "$name"}}
-                }
-            }
-        ]
-        
-        classes = await db.students.aggregate(pipeline).to_list(None)
-        
-        # Then for each class, get the marks data
-        result = []
-        for class_group in classes:
-            class_name = class_group["_id"]
-            total_students = class_group["total_students"]
-            
-            # Get student roll numbers for this class
-            student_roll_numbers = [s["roll_number"] for s in class_group["students"]]
-            
-            # Calculate average score for these students
-            marks_pipeline = [
-                {
-                    "$match": {
-                        "student_id": {"$in": student_roll_numbers}
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": None,
-                        "average_score": {"$avg": "$marks"},
-                        "pass_count": {
-                            "$sum": {
-                                "$cond": [{"$gte": ["$marks", 40]}, 1, 0]
-                            }
-                        },
-                        "total_entries": {"$sum": 1}
-                    }
-                }
-            ]
-            
-            marks_stats = await db.marks.aggregate(marks_pipeline).to_list(None)
-            
-            # Create result entry
-            class_data = {
-                "_id": class_name,
-                "total_students": total_students,
-                "average_score": 0,
-                "pass_rate": 0
-            }
-            
-            if marks_stats and len(marks_stats) > 0:
-                class_data["average_score"] = marks_stats[0].get("average_score", 0)
-                total_entries = marks_stats[0].get("total_entries", 0)
-                if total_entries > 0:
-                    class_data["pass_rate"] = marks_stats[0].get("pass_count", 0) / total_entries
-            
-            result.append(class_data)
-            
-        return result
+        return await report_snapshots.class_performance()
     except Exception as e:
         print(f"Error in class performance query: {str(e)}")
         return []
 
 @app.get("/reports/subject-performance")
-async def get_subject_performance(current_user: User = Depends(get_current_user)):
+async def get_subject_performance(
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks")),
+):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to view reports")
     
-    pipeline = [
-        {
-            "$group": {
-                "_id": "$subject",
-                "average_score": {"$avg": "$marks"},
-                "highest_score": {"$max": "$marks"},
-                "lowest_score": {"$min": "$marks"},
-                "total_students": {"$sum": 1},
-                "pass_rate": {
-                    "$avg": {
-                        "$cond": [{"$gte": ["$marks", 40]}, 1, 0]
-                    }
-                }
-            }
-        }
-    ]
-    
-    subject_performance = await db.marks.aggregate(pipeline).to_list(None)
-    return subject_performance
+    return await report_snapshots.subject_performance()
 
 @app.get("/reports/top-performers")
-async def get_top_performers(current_user: User = Depends(get_current_user)):
+async def get_top_performers(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks", "students")),
+):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to view reports")
     
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "students",
-                "localField": "student_id",  # This is roll_number in the marks collection
-                "foreignField": "roll_number",  # Join with roll_number in students collection
-                "as": "student_info"
-            }
-        },
-        {
-            "$unwind": {
-                "path": "$student_info",
-                "preserveNullAndEmptyArrays": False  # Skip entries without matching students
-            }
-        },
-        {
-            "$group": {
-                "_id": "$student_id",
-                "student_name": {"$first": "$student_info.name"},
-                "class_name": {"$first": "$student_info.class_name"},
-                "average_score": {"$avg": "$marks"},
-                "total_marks": {"$sum": "$marks"},
-                "subjects_count": {"$sum": 1}
-            }
-        },
-        {
-            "$match": {
-                "subjects_count": {"$gt": 0}  # Ensure we have at least one subject
-            }
-        },
-        {
-            "$sort": {"average_score": -1}
-        },
-        {
-            "$limit": 10
-        }
-    ]
-    
     try:
-        top_performers = await db.marks.aggregate(pipeline).to_list(None)
-        print("Top performers query result:", top_performers)  # Debug output
-        return top_performers
+        return await rankings.top(limit=10, versions=request.state.versions)
     except Exception as e:
         print(f"Error in top performers query: {str(e)}")
         return []
 
+@app.get("/rankings/top")
+async def get_rankings_top(
+    request: Request,
+    scope: str = Query(OVERALL, pattern="^(overall|class|subject)$"),
+    key: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks", "students")),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view rankings")
+    if scope != OVERALL and not key:
+        raise HTTPException(status_code=400, detail=f"A {scope} name is required")
+
+    return await rankings.top(scope, key, limit, request.state.versions)
+
+@app.get("/rankings/students/{roll_number}")
+async def get_student_ranking(
+    request: Request,
+    roll_number: str,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks", "students")),
+):
+    if current_user.role == "student" and current_user.username != roll_number:
+        raise HTTPException(status_code=403, detail="Not authorized to view this student")
+
+    standing = await rankings.standing(roll_number, request.state.versions)
+    if standing is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return standing
+
+@app.get("/rankings/stats")
+async def get_ranking_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view rankings")
+    return rankings.stats()
+
+ANALYTICS_GROUP_BY = f"^({'|'.join(GROUP_BY)})$"
+ANALYTICS_VALUES = f"^({'|'.join(VALUES)})$"
+
+@app.get("/analytics/distribution")
+async def get_mark_distribution(
+    request: Request,
+    group_by: str = Query("subject", pattern=ANALYTICS_GROUP_BY),
+    value: str = Query("percentage", pattern=ANALYTICS_VALUES),
+    percentile: list[float] = Query([25, 50, 75]),
+    bins: int = Query(10, ge=1, le=100),
+    range_min: float = 0,
+    range_max: float = 100,
+    pass_threshold: float = 40,
+    class_name: Optional[str] = None,
+    subject: Optional[str] = None,
+    exam_date_from: Optional[datetime] = None,
+    exam_date_to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks", "students")),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view reports")
+    if any(not 0 <= q <= 100 for q in percentile):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    if range_max <= range_min:
+        raise HTTPException(status_code=400, detail="range_max must be greater than range_min")
+
+    return await analytics.distribution(
+        group_by, value, percentile, bins, (range_min, range_max), pass_threshold,
+        subject=subject, class_name=class_name, date_from=exam_date_from, date_to=exam_date_to,
+        versions=request.state.versions,
+    )
+
+@app.get("/analytics/pass-rates")
+async def get_pass_rates(
+    request: Request,
+    threshold: list[float] = Query([40]),
+    group_by: str = Query("subject", pattern=ANALYTICS_GROUP_BY),
+    value: str = Query("percentage", pattern=ANALYTICS_VALUES),
+    class_name: Optional[str] = None,
+    subject: Optional[str] = None,
+    exam_date_from: Optional[datetime] = None,
+    exam_date_to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks", "students")),
+):
+    # What-if: how many would pass if the pass mark were each of these thresholds
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view reports")
+
+    return await analytics.pass_rates(
+        threshold, group_by, value,
+        subject=subject, class_name=class_name, date_from=exam_date_from, date_to=exam_date_to,
+        versions=request.state.versions,
+    )
+
+@app.get("/analytics/stats")
+async def get_analytics_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view reports")
+    return analytics.stats()
+
+@app.get("/reports/terms/{term}/subject-performance")
+async def get_term_subject_performance(
+    term: str,
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(conditional("marks")),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view reports")
+    try:
+        start, end = term_bounds(term)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Terms look like 2024-t1")
+
+    # Archived terms are read on demand; marks entered for the term after it was archived are still hot
+    return summarize_subjects(
+        await marks_archive.subject_stats(term),
+        await subject_stats(db.marks, {"exam_date": {"$gte": start, "$lt": end}}),
+    )
+
+@app.get("/archive/terms")
+async def list_archived_terms(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to archive marks")
+    return await marks_archive.terms()
+
+@app.post("/archive/marks", status_code=202)
+async def archive_marks(
+    before: datetime,
+    target: str = Query("collection", pattern="^(collection|file)$"),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to archive marks")
+
+    # Whole terms only: everything from terms that ended on or before the start of before's term
+    started = marks_archive.start(before, target)
+    return {"started": started, **marks_archive.stats()}
+
+@app.get("/archive/marks")
+async def get_archive_status(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to archive marks")
+    return marks_archive.stats()
+
+@app.post("/reports/rebuild")
+async def rebuild_reports(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to rebuild reports")
+    
+    count = await report_snapshots.rebuild()
+    await rankings.load()
+    await analytics.load()
+    return {"message": f"Rebuilt {count} report snapshots"}
 
 if __name__ == "__main__":
     import uvicorn
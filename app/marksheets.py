@@ -0,0 +1,285 @@
+# /backend/app/marksheets.py
+#
+# Printable marksheets for a whole class, streamed back as one ZIP archive.
+#
+# The class is read with a single cursor: students joined to their marks, one
+# document per student in roll number order. Each student's marksheet is
+# rendered from templates/marksheet.html (HTML, or PDF when WeasyPrint is
+# installed) in a process pool, so neither Jinja2 nor PDF layout runs on the event
+# loop, and each file is added to the archive and sent as soon as it is ready. At
+# most max_in_flight marksheets are rendering or waiting to be written at a time.
+#
+# Job progress lives in the marksheet_jobs collection, so any worker can answer a
+# poll for it.
+
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import AsyncIterator, Optional
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.summary import build_summary
+
+JOBS_COLLECTION = "marksheet_jobs"
+TEMPLATE_DIRECTORY = "templates"
+TEMPLATE = "marksheet.html"
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+_environment = None
+
+
+# Module-level so it can be pickled into the process pool; each worker builds its
+# Jinja2 environment (and template cache) once
+def _render(context: dict, fmt: str) -> bytes:
+    global _environment
+    if _environment is None:
+        from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+        _environment = Environment(loader=FileSystemLoader(TEMPLATE_DIRECTORY), autoescape=select_autoescape(["html"]))
+    html = _environment.get_template(TEMPLATE).render(**context)
+    if fmt == "pdf":
+        from weasyprint import HTML
+
+        return HTML(string=html).write_pdf()
+    return html.encode()
+
+
+def pdf_available() -> bool:
+    return importlib.util.find_spec("weasyprint") is not None
+
+
+def safe_filename(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", value).strip("_") or "unnamed"
+
+
+def class_totals_pipeline(class_name: str) -> list:
+    # Every student's overall totals, to rank against (as in the summary's classmates)
+    return [
+        {"$match": {"class_name": class_name}},
+        {
+            "$lookup": {
+                "from": "marks",
+                "localField": "roll_number",
+                "foreignField": "student_id",
+                "pipeline": [{"$group": {"_id": None, "marks": {"$sum": "$marks"}, "max_marks": {"$sum": "$max_marks"}}}],
+                "as": "totals",
+            }
+        },
+        {"$project": {"_id": 0, "roll_number": 1, "totals": 1}},
+    ]
+
+
+def class_marksheets_pipeline(class_name: str) -> list:
+    return [
+        {"$match": {"class_name": class_name}},
+        {"$sort": {"roll_number": 1}},
+        {
+            "$lookup": {
+                "from": "marks",
+                "localField": "roll_number",
+                "foreignField": "student_id",
+                "pipeline": [
+                    {"$sort": {"subject": 1, "exam_date": 1}},
+                    {"$project": {"_id": 0, "subject": 1, "marks": 1, "max_marks": 1, "exam_date": 1}},
+                ],
+                "as": "marks",
+            }
+        },
+        {"$project": {"_id": 0, "name": 1, "roll_number": 1, "class_name": 1, "section": 1, "marks": 1}},
+    ]
+
+
+def marksheet_context(student: dict, classmates: list[dict], generated_at: datetime) -> dict:
+    # Shaped like student_summary_pipeline's output, so the marksheet matches /students/{roll}/summary
+    subjects = {}
+    for mark in student["marks"]:
+        row = subjects.setdefault(mark["subject"], {"_id": mark["subject"], "marks": 0, "max_marks": 0, "exams": 0})
+        row["marks"] += mark["marks"]
+        row["max_marks"] += mark["max_marks"]
+        row["exams"] += 1
+    summary = build_summary({**student, "subjects": list(subjects.values()), "classmates": classmates})
+    return {"summary": summary, "exams": student["marks"], "generated_at": generated_at}
+
+
+class _ZipSink:
+    """Write-only file object collecting what zipfile writes until it is taken."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class MarksheetRenderer:
+    def __init__(self, db, workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        self.db = db
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self._executor: Optional[Executor] = None
+        self.running = 0
+        self.rendered = 0
+
+    @property
+    def jobs(self):
+        return self.db[JOBS_COLLECTION]
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # Spawned, not forked: the parent has Motor and event loop threads a fork would copy mid-flight
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def start(self, class_name: str, fmt: str, requested_by: str) -> Optional[dict]:
+        """Record a job for class_name; None if the class has no students."""
+        students = 0
+        classmates = []
+        async for row in self.db.students.aggregate(class_totals_pipeline(class_name)):
+            students += 1
+            # Students without marks aren't ranked, matching the summary endpoint
+            if row["totals"]:
+                classmates.append({"roll_number": row["roll_number"], **row["totals"][0]})
+        if not students:
+            return None
+
+        job = {
+            "class_name": class_name,
+            "format": fmt,
+            "requested_by": requested_by,
+            "status": "running",
+            "total": students,
+            "rendered": 0,
+            "failed": [],
+            "bytes": 0,
+            "started_at": datetime.utcnow(),
+            "finished_at": None,
+            "error": None,
+        }
+        result = await self.jobs.insert_one(job)
+        job["_id"] = str(result.inserted_id)
+        # Kept with the in-memory job only; stream() ranks every marksheet against it
+        job["classmates"] = classmates
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        try:
+            job = await self.jobs.find_one({"_id": ObjectId(job_id)})
+        except InvalidId:
+            return None
+        if job is not None:
+            job["_id"] = str(job["_id"])
+        return job
+
+    async def _progress(self, job: dict, **fields):
+        job.update(fields)
+        await self.jobs.update_one(
+            {"_id": ObjectId(job["_id"])},
+            {"$set": {key: job[key] for key in ("status", "rendered", "failed", "bytes", "finished_at", "error")}},
+        )
+
+    async def stream(self, job: dict) -> AsyncIterator[bytes]:
+        """The ZIP archive for a job from start(), yielded a file at a time."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        fmt = job["format"]
+        compression = zipfile.ZIP_DEFLATED if fmt == "html" else zipfile.ZIP_STORED  # PDFs are compressed already
+        generated_at = datetime.utcnow()
+        sink = _ZipSink()
+        archive = zipfile.ZipFile(sink, mode="w")
+        pending: deque = deque()
+        last_progress = time.monotonic()
+        self.running += 1
+
+        def add(filename: str, data: bytes):
+            info = zipfile.ZipInfo(filename, date_time=generated_at.timetuple()[:6])
+            info.compress_type = compression
+            archive.writestr(info, data)
+
+        async def finish_next() -> bytes:
+            roll_number, filename, future = pending.popleft()
+            try:
+                add(filename, await future)
+                job["rendered"] += 1
+                self.rendered += 1
+            except Exception as e:
+                print(f"Error rendering marksheet for {roll_number}: {str(e)}")
+                job["failed"].append(roll_number)
+            data = sink.take()
+            job["bytes"] += len(data)
+            return data
+
+        try:
+            cursor = self.db.students.aggregate(class_marksheets_pipeline(job["class_name"]), batchSize=self.max_in_flight)
+            async for student in cursor:
+                context = marksheet_context(student, job["classmates"], generated_at)
+                filename = f"{safe_filename(student['roll_number'])}_{safe_filename(student['name'])}.{fmt}"
+                pending.append((student["roll_number"], filename, loop.run_in_executor(executor, _render, context, fmt)))
+                # Back-pressure: wait for the oldest marksheet before reading further ahead
+                if len(pending) >= self.max_in_flight:
+                    yield await finish_next()
+                if time.monotonic() - last_progress >= PROGRESS_INTERVAL_SECONDS:
+                    await self._progress(job)
+                    last_progress = time.monotonic()
+            while pending:
+                yield await finish_next()
+
+            if job["failed"]:
+                add("errors.txt", ("Marksheets that failed to render:\n" + "\n".join(job["failed"]) + "\n").encode())
+            archive.close()
+            data = sink.take()
+            job["bytes"] += len(data)
+            await self._progress(job, status="completed", finished_at=datetime.utcnow())
+            yield data
+        except Exception as e:
+            print(f"Error generating marksheets for {job['class_name']}: {str(e)}")
+            if isinstance(e, BrokenProcessPool):
+                self._executor = None  # A renderer died; the next job gets a fresh pool
+            await self._progress(job, status="failed", error=str(e), finished_at=datetime.utcnow())
+            raise
+        finally:
+            self.running -= 1
+            for _, _, future in pending:
+                future.cancel()
+            if job["status"] == "running":
+                # The client went away mid-download; record it without awaiting in a closing generator
+                job.update(status="cancelled", finished_at=datetime.utcnow())
+                loop.create_task(self._progress(job))
+
+    def after_fork(self):
+        # Pool processes don't survive a fork; start clean in the child
+        self._executor = None
+        self.running = self.rendered = 0
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "running_jobs": self.running,
+            "rendered": self.rendered,
+        }
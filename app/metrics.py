@@ -0,0 +1,207 @@
+# /backend/app/metrics.py
+#
+# Per-request timing and MongoDB command accounting.
+#
+# MetricsMiddleware opens a RequestStats for every HTTP request and stores it in
+# a context variable; CommandListener (registered on the Motor client) adds each
+# command's duration to whichever request issued it. Motor runs commands on its
+# executor with a copy of the caller's context, so the listener sees the same
+# RequestStats object. Aggregated histograms are rendered in Prometheus text format.
+
+from collections import defaultdict
+from contextvars import ContextVar
+from pymongo import monitoring
+from typing import Optional
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger("app.metrics")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...], buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts, then sum and count
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            base = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            sep = "," if base else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Wall time per HTTP request.", ("method", "route", "status"), LATENCY_BUCKETS
+)
+REQUEST_DB_COMMANDS = Histogram(
+    "http_request_db_commands", "MongoDB commands issued per HTTP request.", ("method", "route"), COUNT_BUCKETS
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_seconds", "Time spent in MongoDB per HTTP request.", ("method", "route"), LATENCY_BUCKETS
+)
+DB_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency.", ("collection", "command"), LATENCY_BUCKETS
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_commands = 0
+        self.db_seconds = 0.0
+        # (collection, command) -> [count, seconds]
+        self.breakdown: dict[tuple[str, str], list] = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+
+    def record(self, collection: str, command: str, seconds: float):
+        with self._lock:
+            self.db_commands += 1
+            self.db_seconds += seconds
+            entry = self.breakdown[(collection, command)]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def summary(self) -> dict:
+        return {
+            f"{collection}.{command}": {"count": count, "ms": round(seconds * 1000, 3)}
+            for (collection, command), (count, seconds) in sorted(self.breakdown.items())
+        }
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+# Keys that hold the interesting part of a command when logging slow queries
+COMMAND_DETAIL_KEYS = ("filter", "pipeline", "updates", "deletes", "query", "key", "sort", "limit")
+
+
+class CommandListener(monitoring.CommandListener):
+    def __init__(self, slow_query_ms: float = 100.0):
+        self.slow_query_ms = slow_query_ms
+        self._pending: dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        command = event.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        detail = {key: command[key] for key in COMMAND_DETAIL_KEYS if key in command}
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else "-",
+                current_request.get(),
+                detail,
+            )
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        collection, stats, detail = pending
+        seconds = event.duration_micros / 1_000_000
+        DB_COMMAND_DURATION.observe(seconds, collection, event.command_name)
+        if stats is not None:
+            stats.record(collection, event.command_name, seconds)
+        if seconds * 1000 >= self.slow_query_ms or failed:
+            logger.warning(
+                "%s query: %s.%s took %.1f ms %s",
+                "Failed" if failed else "Slow",
+                collection,
+                event.command_name,
+                seconds * 1000,
+                json.dumps(detail, default=str),
+            )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request and exposing its DB usage as a Server-Timing header."""
+
+    def __init__(self, app, slow_request_ms: float = 500.0):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f"db;dur={stats.db_seconds * 1000:.1f};desc=\"{stats.db_commands} commands\"".encode(),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - stats.started
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUEST_DURATION.observe(elapsed, method, route_path, str(status_code))
+            REQUEST_DB_COMMANDS.observe(stats.db_commands, method, route_path)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, method, route_path)
+            if elapsed * 1000 >= self.slow_request_ms:
+                logger.warning(
+                    "Slow request: %s %s took %.1f ms (%d DB commands, %.1f ms in DB) %s",
+                    method, route_path, elapsed * 1000, stats.db_commands, stats.db_seconds * 1000,
+                    json.dumps(stats.summary()),
+                )
+
+
+def render_metrics(extra_gauges: Optional[dict[str, float]] = None) -> str:
+    lines = []
+    for histogram in (REQUEST_DURATION, REQUEST_DB_COMMANDS, REQUEST_DB_DURATION, DB_COMMAND_DURATION):
+        lines.extend(histogram.render())
+    for name, value in (extra_gauges or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
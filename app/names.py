@@ -0,0 +1,68 @@
+# /backend/app/names.py
+#
+# Process-local roll_number -> student name cache used to label marks. A page (or
+# export batch) of marks is labelled with at most one students query for the roll
+# numbers not already cached, instead of a $lookup per mark document.
+#
+# Entries are tagged with the shared students version (app/versions.py) they were
+# read at. A caller that passes the version behind its response's ETag only gets
+# names read at that version, so a rename on another worker can't be served under
+# an ETag that already counts it; without a version any unexpired entry will do.
+
+from typing import AsyncIterator, Iterable, Optional
+
+from app.cache import TTLCache
+
+UNKNOWN_STUDENT = "Unknown Student"
+
+
+class StudentNames:
+    def __init__(self, db, maxsize: int = 50000, ttl: float = 60.0):
+        self.db = db
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.queries = 0
+
+    async def resolve(self, roll_numbers: Iterable[str], version: Optional[int] = None) -> dict[str, str]:
+        names = {}
+        missing = []
+        for roll_number in set(roll_numbers):
+            entry = self.cache.get(roll_number)
+            if entry is None or (version is not None and entry[0] != version):
+                missing.append(roll_number)
+            else:
+                names[roll_number] = entry[1]
+        if missing:
+            self.queries += 1
+            async for student in self.db.students.find(
+                {"roll_number": {"$in": missing}}, {"_id": 0, "roll_number": 1, "name": 1}
+            ):
+                names[student["roll_number"]] = student["name"]
+            # Cache misses too, so orphaned marks don't cost a query on every page
+            for roll_number in missing:
+                names.setdefault(roll_number, UNKNOWN_STUDENT)
+                self.cache.set(roll_number, (version, names[roll_number]))
+        return names
+
+    async def attach(self, marks: list[dict], version: Optional[int] = None) -> list[dict]:
+        names = await self.resolve((mark["student_id"] for mark in marks), version)
+        for mark in marks:
+            mark["student_name"] = names[mark["student_id"]]
+        return marks
+
+    async def attach_stream(self, cursor, batch_size: int) -> AsyncIterator[dict]:
+        batch = []
+        async for mark in cursor:
+            batch.append(mark)
+            if len(batch) >= batch_size:
+                for labelled in await self.attach(batch):
+                    yield labelled
+                batch = []
+        for labelled in await self.attach(batch):
+            yield labelled
+
+    def invalidate(self, *roll_numbers: str):
+        for roll_number in roll_numbers:
+            self.cache.pop(roll_number)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "queries": self.queries}
@@ -0,0 +1,257 @@
+# /backend/app/ranking.py
+#
+# In-memory leaderboards for student rankings: one overall, one per class and one
+# per subject, each a sorted list keyed by average score. Top-k, rank-of-student and
+# percentile are O(log n) (plus k for top-k), and mark writes update the affected
+# boards incrementally instead of re-aggregating the marks collection.
+#
+# Every worker process keeps its own copy. Writes handled by this process are
+# applied immediately. The boards remember the shared collection versions
+# (app/versions.py) they reflect, and a read that passes newer versions reloads
+# them first, so writes made by other workers show up before the response (and its
+# ETag) is built. They are also reloaded every RANKING_REFRESH_SECONDS.
+
+from sortedcontainers import SortedKeyList
+from typing import Optional
+import asyncio
+import time
+
+from app.versions import CollectionVersions, advance, behind
+
+OVERALL = "overall"
+TRACKED = ("marks", "students")
+
+
+class Leaderboard:
+    """Members ordered by descending score; ties share a rank."""
+
+    def __init__(self):
+        self._entries = SortedKeyList(key=lambda entry: -entry[1])
+        self._scores: dict[str, float] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set(self, member: str, score: float):
+        self.remove(member)
+        self._entries.add((member, score))
+        self._scores[member] = score
+
+    def remove(self, member: str):
+        score = self._scores.pop(member, None)
+        if score is not None:
+            self._entries.remove((member, score))
+
+    def score(self, member: str) -> Optional[float]:
+        return self._scores.get(member)
+
+    def top(self, k: int) -> list[tuple[str, float]]:
+        return list(self._entries.islice(0, k))
+
+    def rank(self, member: str) -> Optional[int]:
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return self._entries.bisect_key_left(-score) + 1
+
+    def percentile(self, member: str) -> Optional[float]:
+        # Share of the other members ranked below this one; the top scorer is 100
+        rank = self.rank(member)
+        if rank is None:
+            return None
+        n = len(self._entries)
+        return 100.0 * (n - rank) / (n - 1) if n > 1 else 100.0
+
+
+def board_id(scope: str, key: Optional[str] = None) -> str:
+    return OVERALL if scope == OVERALL else f"{scope}:{key}"
+
+
+class RankingEngine:
+    def __init__(self, db, refresh_seconds: float = 300):
+        self.db = db
+        self.refresh_seconds = refresh_seconds
+        self.students: dict[str, dict] = {}  # roll_number -> name, class_name
+        self.totals: dict[str, dict[str, list]] = {}  # roll_number -> subject -> [sum, count]
+        self.boards: dict[str, Leaderboard] = {}
+        self.loaded_at: Optional[float] = None
+        self.versions: Optional[dict[str, int]] = None  # The shared versions the boards reflect
+        self._dirty = True
+        self._generation = 0
+        self._reload_task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _board(self, board: str) -> Leaderboard:
+        if board not in self.boards:
+            self.boards[board] = Leaderboard()
+        return self.boards[board]
+
+    # Loading
+    async def load(self, wanted: Optional[dict] = None):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if wanted is not None and not self._dirty and not behind(self.versions, wanted, TRACKED):
+                return  # Another request's reload already caught up
+            generation = self._generation
+            # Read first: writes that land during the load make the boards newer, never older, than this
+            versions = await CollectionVersions(self.db).current(TRACKED)
+            students = {
+                s["roll_number"]: {"name": s["name"], "class_name": s["class_name"]}
+                async for s in self.db.students.find({}, {"_id": 0, "roll_number": 1, "name": 1, "class_name": 1})
+            }
+            totals: dict[str, dict[str, list]] = {}
+            pipeline = [{
+                "$group": {
+                    "_id": {"student_id": "$student_id", "subject": "$subject"},
+                    "sum": {"$sum": "$marks"},
+                    "count": {"$sum": 1},
+                }
+            }]
+            async for row in self.db.marks.aggregate(pipeline):
+                roll_number = row["_id"]["student_id"]
+                if roll_number in students:
+                    totals.setdefault(roll_number, {})[row["_id"]["subject"]] = [row["sum"], row["count"]]
+
+            # Build into fresh structures, then swap, so reads never see a half-loaded state
+            self.students, self.totals, self.boards = students, totals, {}
+            for roll_number in totals:
+                self._rescore(roll_number, *totals[roll_number])
+            self.loaded_at = time.monotonic()
+            self.versions = versions
+            # A write that raced the load may be missing from it; reload again on the next read
+            self._dirty = self._generation != generation
+
+    async def ensure_fresh(self, versions: Optional[dict] = None):
+        """Reload first if dirty, or if versions (the request's, from conditional()) are newer than the boards."""
+        if self._dirty or self.loaded_at is None:
+            await self.load()
+        elif versions is not None and behind(self.versions, versions, TRACKED):
+            await self.load(versions)
+        elif time.monotonic() - self.loaded_at > self.refresh_seconds:
+            # Serve the current boards while a background reload catches up
+            if self._reload_task is None or self._reload_task.done():
+                self._reload_task = asyncio.create_task(self.load())
+
+    # Incremental maintenance
+    def _rescore(self, roll_number: str, *subjects: str):
+        student = self.students[roll_number]
+        totals = self.totals.get(roll_number, {})
+        for subject in subjects:
+            if subject in totals:
+                total, count = totals[subject]
+                self._board(board_id("subject", subject)).set(roll_number, total / count)
+            else:
+                self._board(board_id("subject", subject)).remove(roll_number)
+
+        count = sum(c for _, c in totals.values())
+        class_board = self._board(board_id("class", student["class_name"]))
+        if count:
+            average = sum(s for s, _ in totals.values()) / count
+            self._board(OVERALL).set(roll_number, average)
+            class_board.set(roll_number, average)
+        else:
+            self._board(OVERALL).remove(roll_number)
+            class_board.remove(roll_number)
+
+    def _apply(self, mark: dict, sign: int):
+        roll_number = mark["student_id"]
+        if roll_number not in self.students:
+            return  # Marks without a student aren't ranked
+        subject_totals = self.totals.setdefault(roll_number, {})
+        entry = subject_totals.setdefault(mark["subject"], [0, 0])
+        entry[0] += sign * float(mark["marks"])
+        entry[1] += sign
+        if entry[1] <= 0:
+            del subject_totals[mark["subject"]]
+        self._rescore(roll_number, mark["subject"])
+
+    def marks_changed(self, changes: list[tuple[Optional[dict], Optional[dict]]]):
+        """Apply (old_mark, new_mark) pairs, as in ReportSnapshots.marks_changed."""
+        self._generation += 1
+        for old_mark, new_mark in changes:
+            if old_mark is not None:
+                self._apply(old_mark, -1)
+            if new_mark is not None:
+                self._apply(new_mark, 1)
+
+    def students_added(self, *students: dict):
+        # Students without marks aren't on any board yet; just learn their class for later marks
+        self._generation += 1
+        for student in students:
+            self.students.setdefault(
+                student["roll_number"], {"name": student["name"], "class_name": student["class_name"]}
+            )
+
+    def advance(self, bumped: dict):
+        """After applying a write of this process's, the versions bump() returned for it."""
+        self.versions = advance(self.versions, bumped)
+
+    def students_changed(self):
+        # Renames, class moves and deletes reshuffle several boards; reload on the next read
+        self._generation += 1
+        self._dirty = True
+
+    # Queries
+    def _row(self, roll_number: str, score: float, subject: Optional[str] = None) -> dict:
+        student = self.students[roll_number]
+        totals = self.totals.get(roll_number, {})
+        if subject is not None:
+            total, count = totals.get(subject, (0, 0))
+        else:
+            total = sum(s for s, _ in totals.values())
+            count = sum(c for _, c in totals.values())
+        return {
+            "_id": roll_number,
+            "student_name": student["name"],
+            "class_name": student["class_name"],
+            "average_score": score,
+            "total_marks": total,
+            "subjects_count": count,
+        }
+
+    async def top(
+        self, scope: str = OVERALL, key: Optional[str] = None, limit: int = 10, versions: Optional[dict] = None
+    ) -> list[dict]:
+        await self.ensure_fresh(versions)
+        board = self.boards.get(board_id(scope, key))
+        if board is None:
+            return []
+        subject = key if scope == "subject" else None
+        return [self._row(roll_number, score, subject) for roll_number, score in board.top(limit)]
+
+    def _standing(self, board_name: str, roll_number: str) -> Optional[dict]:
+        board = self.boards.get(board_name)
+        if board is None or board.score(roll_number) is None:
+            return None
+        return {
+            "average_score": board.score(roll_number),
+            "rank": board.rank(roll_number),
+            "out_of": len(board),
+            "percentile": board.percentile(roll_number),
+        }
+
+    async def standing(self, roll_number: str, versions: Optional[dict] = None) -> Optional[dict]:
+        await self.ensure_fresh(versions)
+        student = self.students.get(roll_number)
+        if student is None:
+            return None
+        return {
+            "roll_number": roll_number,
+            "student_name": student["name"],
+            "class_name": student["class_name"],
+            "overall": self._standing(OVERALL, roll_number),
+            "class": self._standing(board_id("class", student["class_name"]), roll_number),
+            "subjects": {
+                subject: self._standing(board_id("subject", subject), roll_number)
+                for subject in sorted(self.totals.get(roll_number, {}))
+            },
+        }
+
+    def stats(self) -> dict:
+        return {
+            "students": len(self.students),
+            "boards": len(self.boards),
+            "ranked": len(self.boards.get(OVERALL, ())),
+            "age_seconds": time.monotonic() - self.loaded_at if self.loaded_at is not None else None,
+        }
@@ -0,0 +1,334 @@
+# /backend/app/reports.py
+#
+# Materialized per-class and per-subject aggregates backing the /reports/*
+# endpoints (top performers come from app/ranking.py). Mark writes update the snapshots incrementally; changes
+# that can't be applied as a delta (a student moving class, a deleted minimum)
+# flag the snapshot as stale and it is recomputed for that one key on the next read.
+# Every write to a snapshot bumps its revision, so a recomputation only lands if
+# nothing touched the snapshot while it ran (otherwise it stays stale for the next read).
+#
+#   python -m app.reports --rebuild    # recompute every snapshot from scratch
+
+from pymongo import ReplaceOne, UpdateOne
+from typing import Optional
+import asyncio
+import sys
+
+from app.versions import CollectionVersions
+
+PASS_MARK = 40
+SNAPSHOT_COLLECTION = "report_snapshots"
+REBUILD_BATCH_SIZE = 1000
+
+AVERAGE_STAGE = {
+    "$set": {
+        "average": {
+            "$cond": [{"$gt": ["$count", 0]}, {"$divide": ["$sum", "$count"]}, 0]
+        }
+    }
+}
+
+STATS_GROUP = {
+    "_id": None,
+    "sum": {"$sum": "$marks"},
+    "count": {"$sum": 1},
+    "pass_count": {"$sum": {"$cond": [{"$gte": ["$marks", PASS_MARK]}, 1, 0]}},
+    "min": {"$min": "$marks"},
+    "max": {"$max": "$marks"},
+}
+
+EMPTY_STATS = {"sum": 0, "count": 0, "pass_count": 0, "min": None, "max": None}
+
+
+def snapshot_id(kind: str, key: str) -> str:
+    return f"{kind}:{key}"
+
+
+def _snapshot(kind: str, key: str, stats: dict, **fields) -> dict:
+    count = stats.get("count", 0)
+    return {
+        "_id": snapshot_id(kind, key),
+        "kind": kind,
+        "key": key,
+        "sum": stats.get("sum", 0),
+        "count": count,
+        "pass_count": stats.get("pass_count", 0),
+        "min": stats.get("min"),
+        "max": stats.get("max"),
+        "average": stats.get("sum", 0) / count if count else 0,
+        "stale": False,
+        **fields,
+    }
+
+
+def merge_stats(totals: dict, stats: dict) -> dict:
+    """Fold stats (shaped like a STATS_GROUP row) into totals, in place."""
+    for field in ("sum", "count", "pass_count"):
+        totals[field] += stats[field]
+    if stats["min"] is not None:
+        totals["min"] = stats["min"] if totals["min"] is None else min(totals["min"], stats["min"])
+        totals["max"] = stats["max"] if totals["max"] is None else max(totals["max"], stats["max"])
+    return totals
+
+
+def add_mark(stats: dict, mark: dict) -> dict:
+    """Count one mark into per-subject stats, in place; for marks streamed from outside MongoDB."""
+    value = mark["marks"]
+    passed = 1 if value >= PASS_MARK else 0
+    entry = stats.setdefault(mark["subject"], dict(EMPTY_STATS))
+    return merge_stats(entry, {"sum": value, "count": 1, "pass_count": passed, "min": value, "max": value})
+
+
+async def subject_stats(collection, match: dict) -> dict[str, dict]:
+    """Per-subject stats of the marks in collection (marks or an archive) matching match, grouped in MongoDB."""
+    pipeline = [{"$match": match}, {"$group": {**STATS_GROUP, "_id": "$subject"}}]
+    return {row["_id"]: row async for row in collection.aggregate(pipeline)}
+
+
+def summarize_subjects(*subject_stats: dict[str, dict]) -> list[dict]:
+    """Subject performance rows, shaped like ReportSnapshots.subject_performance, for marks outside the snapshots.
+
+    Each argument maps subject to its stats (a STATS_GROUP row, or built with add_mark); they are combined.
+    """
+    stats = {}
+    for part in subject_stats:
+        for subject, row in part.items():
+            merge_stats(stats.setdefault(subject, dict(EMPTY_STATS)), row)
+    return [
+        {
+            "_id": subject,
+            "average_score": s["sum"] / s["count"],
+            "highest_score": s["max"],
+            "lowest_score": s["min"],
+            "total_students": s["count"],
+            "pass_rate": s["pass_count"] / s["count"],
+        }
+        for subject, s in sorted(stats.items())
+    ]
+
+
+def _literal_fields(fields: dict) -> dict:
+    # Values inside an update pipeline are expressions; wrap them so "$..." strings stay literal
+    return {name: {"$literal": value} for name, value in fields.items()}
+
+
+class ReportSnapshots:
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def collection(self):
+        return self.db[SNAPSHOT_COLLECTION]
+
+    # Incremental maintenance
+    def _add_op(self, kind: str, key: str, value: float, **fields) -> UpdateOne:
+        passed = 1 if value >= PASS_MARK else 0
+        return UpdateOne(
+            {"_id": snapshot_id(kind, key)},
+            [
+                {
+                    "$set": {
+                        **_literal_fields({"kind": kind, "key": key, **fields}),
+                        "sum": {"$add": [{"$ifNull": ["$sum", 0]}, value]},
+                        "count": {"$add": [{"$ifNull": ["$count", 0]}, 1]},
+                        "pass_count": {"$add": [{"$ifNull": ["$pass_count", 0]}, passed]},
+                        "min": {"$min": [{"$ifNull": ["$min", value]}, value]},
+                        "max": {"$max": [{"$ifNull": ["$max", value]}, value]},
+                        "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]},
+                    }
+                },
+                AVERAGE_STAGE,
+            ],
+            upsert=True,
+        )
+
+    def _remove_op(self, kind: str, key: str, value: float) -> UpdateOne:
+        passed = 1 if value >= PASS_MARK else 0
+        return UpdateOne(
+            {"_id": snapshot_id(kind, key)},
+            [
+                {
+                    "$set": {
+                        "sum": {"$subtract": [{"$ifNull": ["$sum", 0]}, value]},
+                        "count": {"$subtract": [{"$ifNull": ["$count", 0]}, 1]},
+                        "pass_count": {"$subtract": [{"$ifNull": ["$pass_count", 0]}, passed]},
+                        "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]},
+                        # min/max can't be un-applied; if the removed value was an extreme, recompute later
+                        "stale": {
+                            "$or": [
+                                {"$eq": ["$stale", True]},
+                                {"$lte": [value, "$min"]},
+                                {"$gte": [value, "$max"]},
+                            ]
+                        },
+                    }
+                },
+                AVERAGE_STAGE,
+            ],
+        )
+
+    def _stale_op(self, kind: str, key: str) -> UpdateOne:
+        return UpdateOne(
+            {"_id": snapshot_id(kind, key)},
+            {"$set": {"kind": kind, "key": key, "stale": True}, "$inc": {"revision": 1}},
+            upsert=True,
+        )
+
+    def _mark_ops(self, mark: dict, student: Optional[dict], remove: bool = False) -> list:
+        value = float(mark["marks"])
+        targets = [("subject", mark["subject"])]
+        if student:
+            targets.append(("class", student["class_name"]))
+        if remove:
+            return [self._remove_op(kind, key, value) for kind, key in targets]
+        return [self._add_op(kind, key, value) for kind, key in targets]
+
+    async def _apply(self, ops: list):
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+
+    async def marks_changed(self, changes: list[tuple[Optional[dict], Optional[dict]]], students: dict):
+        """Apply (old_mark, new_mark) pairs; old_mark is None for inserts, new_mark None for deletes.
+
+        students maps roll_number to the student document for every mark involved.
+        """
+        ops = []
+        for old_mark, new_mark in changes:
+            if old_mark is not None:
+                ops += self._mark_ops(old_mark, students.get(old_mark["student_id"]), remove=True)
+            if new_mark is not None:
+                ops += self._mark_ops(new_mark, students.get(new_mark["student_id"]))
+        await self._apply(ops)
+
+    async def students_added(self, *students: dict):
+        """New students only change their class's head count, so only the class snapshots are flagged."""
+        classes = {student["class_name"] for student in students}
+        await self._apply([self._stale_op("class", class_name) for class_name in classes])
+
+    async def students_changed(self, *students: Optional[dict]):
+        """Flag the class snapshots touched by a student update or delete for recomputation."""
+        classes = {student["class_name"] for student in students if student}
+        await self._apply([self._stale_op("class", class_name) for class_name in classes])
+
+    async def subjects_changed(self, subjects):
+        await self._apply([self._stale_op("subject", subject) for subject in subjects])
+
+    # Recomputation
+    async def _stats(self, match: dict) -> dict:
+        rows = await self.db.marks.aggregate([{"$match": match}, {"$group": STATS_GROUP}]).to_list(None)
+        return rows[0] if rows else EMPTY_STATS
+
+    async def refresh(self, kind: str, key: str, revision: Optional[int] = None):
+        """Recompute a stale snapshot read at revision; a no-op if it has been written to since."""
+        _id = snapshot_id(kind, key)
+        if kind == "subject":
+            stats = await self._stats({"subject": key})
+            doc = _snapshot(kind, key, stats) if stats["count"] else None
+        elif kind == "class":
+            roll_numbers = await self.db.students.distinct("roll_number", {"class_name": key})
+            doc = None
+            if roll_numbers:
+                stats = await self._stats({"student_id": {"$in": roll_numbers}})
+                doc = _snapshot(kind, key, stats, student_count=len(roll_numbers))
+        else:
+            doc = None  # A kind no longer kept (the old per-student snapshots)
+
+        # A delta that landed meanwhile may be missing from these stats; so may a rebuild or
+        # another refresh have replaced the snapshot already. Either way leave it alone
+        unchanged = {"_id": _id, "stale": True, "revision": revision}
+        if doc is None:
+            await self.collection.delete_one(unchanged)
+        else:
+            await self.collection.replace_one(unchanged, doc)
+
+    async def refresh_stale(self):
+        async for snapshot in self.collection.find({"stale": True}, {"kind": 1, "key": 1, "revision": 1}):
+            await self.refresh(snapshot["kind"], snapshot["key"], snapshot.get("revision"))
+
+    async def rebuild(self) -> int:
+        """Recompute every snapshot from the students and marks collections."""
+        # Only these can be left over; one a delta creates while the rebuild runs is kept
+        previous = set(await self.collection.distinct("_id"))
+        students = {}
+        class_counts = {}
+        async for student in self.db.students.find({}, {"roll_number": 1, "class_name": 1}):
+            students[student["roll_number"]] = student
+            class_counts[student["class_name"]] = class_counts.get(student["class_name"], 0) + 1
+
+        docs = []
+        class_stats = {name: dict(EMPTY_STATS) for name in class_counts}
+        # Per student first, then rolled up into classes
+        async for row in self.db.marks.aggregate([{"$group": {**STATS_GROUP, "_id": "$student_id"}}]):
+            student = students.get(row["_id"])
+            if student is None:
+                continue  # Marks without a student don't count towards class reports
+            merge_stats(class_stats[student["class_name"]], row)
+
+        for name, stats in class_stats.items():
+            docs.append(_snapshot("class", name, stats, student_count=class_counts[name]))
+        async for row in self.db.marks.aggregate([{"$group": {**STATS_GROUP, "_id": "$subject"}}]):
+            docs.append(_snapshot("subject", row["_id"], row))
+
+        # Replaced in place rather than cleared and reinserted: reads never find the reports
+        # empty, and a delta upserting a snapshot meanwhile can't collide with an insert
+        for start in range(0, len(docs), REBUILD_BATCH_SIZE):
+            await self.collection.bulk_write(
+                [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs[start:start + REBUILD_BATCH_SIZE]],
+                ordered=False,
+            )
+        vanished = previous.difference(doc["_id"] for doc in docs)
+        if vanished:
+            await self.collection.delete_many({"_id": {"$in": list(vanished)}})
+        # A rebuild can change any report (it is how drift gets repaired), so no ETag handed out before it still holds
+        await CollectionVersions(self.db).bump("marks", "students")
+        return len(docs)
+
+    async def rebuild_if_empty(self):
+        if await self.collection.estimated_document_count() == 0:
+            await self.rebuild()
+        else:
+            # Left behind by versions that kept per-student snapshots
+            await self.collection.delete_many({"kind": "student"})
+
+    # Report reads
+    async def class_performance(self) -> list[dict]:
+        await self.refresh_stale()
+        return [
+            {
+                "_id": s["key"],
+                "total_students": s.get("student_count", 0),
+                "average_score": s.get("average", 0),
+                "pass_rate": s["pass_count"] / s["count"] if s.get("count") else 0,
+            }
+            async for s in self.collection.find({"kind": "class"})
+        ]
+
+    async def subject_performance(self) -> list[dict]:
+        await self.refresh_stale()
+        return [
+            {
+                "_id": s["key"],
+                "average_score": s["average"],
+                "highest_score": s["max"],
+                "lowest_score": s["min"],
+                "total_students": s["count"],
+                "pass_rate": s["pass_count"] / s["count"],
+            }
+            async for s in self.collection.find({"kind": "subject", "count": {"$gt": 0}})
+        ]
+
+
+async def main() -> int:
+    from app.database import database
+
+    count = await ReportSnapshots(database).rebuild()
+    print(f"Rebuilt {count} report snapshots")
+    database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    if "--rebuild" not in sys.argv[1:]:
+        print("Usage: python -m app.reports --rebuild")
+        sys.exit(2)
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,103 @@
+# /backend/app/serve.py
+#
+# Production entry point: runs N worker processes serving app.main:app.
+#
+#   python -m app.serve --workers 4 --port 8000
+#   python -m app.serve --preload          # import the app once in the master, then fork
+#
+# Uses gunicorn with uvicorn workers when gunicorn is installed (Linux/macOS),
+# otherwise falls back to uvicorn's own multi-process mode, which has no preload.
+# Either way SIGTERM stops accepting connections and lets in-flight requests
+# finish for up to --graceful-timeout seconds before workers exit.
+
+import argparse
+import os
+import sys
+
+APP = "app.main:app"
+
+
+def default_workers() -> int:
+    # Respect CPU affinity / container limits where the platform exposes them
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def post_fork(server, worker):
+    # With --preload the master has already imported app.main; make sure the worker
+    # doesn't reuse anything it created (Motor client, bcrypt and marksheet pools)
+    main_module = sys.modules.get("app.main")
+    if main_module is not None:
+        main_module.database.after_fork()
+        main_module.password_hasher.after_fork()
+        main_module.marksheets.after_fork()
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", args.preload)
+            self.cfg.set("graceful_timeout", args.graceful_timeout)
+            self.cfg.set("timeout", args.timeout)
+            self.cfg.set("keepalive", args.keepalive)
+            self.cfg.set("post_fork", post_fork)
+            self.cfg.set("accesslog", "-" if args.access_log else None)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    Application().run()
+
+
+def run_uvicorn(args):
+    import uvicorn
+
+    if args.preload:
+        print("Preload needs gunicorn (pip install gunicorn); starting workers without it", file=sys.stderr)
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=args.keepalive,
+        access_log=args.access_log,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the marksheet API with multiple worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or default_workers())
+    parser.add_argument("--preload", action="store_true", help="import the app once before forking workers")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds to drain requests on SIGTERM")
+    parser.add_argument("--timeout", type=int, default=60, help="seconds before a silent worker is restarted")
+    parser.add_argument("--keepalive", type=int, default=5)
+    parser.add_argument("--access-log", action="store_true")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "uvicorn"], default="auto")
+    args = parser.parse_args(argv)
+
+    server = args.server
+    if server == "auto":
+        try:
+            import gunicorn  # noqa: F401
+            server = "gunicorn"
+        except ImportError:
+            server = "uvicorn"
+    if server == "gunicorn":
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
+
+if __name__ == "__main__":
+    main()
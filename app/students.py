@@ -0,0 +1,113 @@
+# /backend/app/students.py
+#
+# Process-local read-through cache of student documents, keyed by both ObjectId
+# and roll number. GET /students/{student_id} accepts either, so a cold lookup is
+# one $or query rather than an _id query followed by a roll_number query.
+#
+# Entries are tagged with the shared students version (app/versions.py) they were
+# read at and only served to lookups at that same version, so a write on any
+# worker retires them. Lookups without a version (the write handlers, which must
+# act on the student as it is now) always go to the database.
+
+from typing import Optional
+import time
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.cache import TTLCache
+
+
+def _object_id(key: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(key)
+    except (InvalidId, TypeError):
+        return None
+
+
+class StudentResolver:
+    def __init__(self, db, maxsize: int = 10000, ttl: float = 60.0):
+        self.db = db
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def _cached(self, version: Optional[int], *keys: tuple) -> Optional[dict]:
+        if version is None:
+            return None
+        for key in keys:
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                # Copies, so callers can reshape the document (e.g. stringify _id) freely
+                return dict(entry[1])
+        self.misses += 1
+        return None
+
+    def _remember(self, student: dict, version: int):
+        self.cache.set(("_id", student["_id"]), (version, student))
+        self.cache.set(("roll_number", student["roll_number"]), (version, student))
+
+    async def _find(
+        self, query: dict, version: Optional[int], prefer_id: Optional[ObjectId] = None
+    ) -> Optional[dict]:
+        self.queries += 1
+        started = time.perf_counter()
+        candidates = await self.db.students.find(query).limit(2).to_list(length=2)
+        self.query_seconds += time.perf_counter() - started
+        if not candidates:
+            return None
+        # An _id match wins over a roll number that happens to look like one
+        student = next((s for s in candidates if s["_id"] == prefer_id), candidates[0])
+        if version is not None:
+            self._remember(student, version)
+        return dict(student)
+
+    async def resolve(self, key: str, version: Optional[int] = None) -> Optional[dict]:
+        """The student whose ObjectId or roll number is key; cached only when given the students version."""
+        object_id = _object_id(key)
+        if object_id is None:
+            return await self.by_roll(key, version)
+        student = self._cached(version, ("_id", object_id), ("roll_number", key))
+        if student is not None:
+            return student
+        return await self._find({"$or": [{"_id": object_id}, {"roll_number": key}]}, version, prefer_id=object_id)
+
+    async def by_roll(self, roll_number: str, version: Optional[int] = None) -> Optional[dict]:
+        student = self._cached(version, ("roll_number", roll_number))
+        if student is not None:
+            return student
+        return await self._find({"roll_number": roll_number}, version)
+
+    async def by_id(self, student_id: str, version: Optional[int] = None) -> Optional[dict]:
+        object_id = _object_id(student_id)
+        if object_id is None:
+            return None
+        student = self._cached(version, ("_id", object_id))
+        if student is not None:
+            return student
+        return await self._find({"_id": object_id}, version)
+
+    def invalidate(self, *students: Optional[dict]):
+        for student in students:
+            if student:
+                self.cache.pop(("roll_number", student["roll_number"]))
+                if "_id" in student:
+                    self.cache.pop(("_id", _object_id(str(student["_id"]))))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        average_query = self.query_seconds / self.queries if self.queries else 0.0
+        return {
+            "size": len(self.cache),
+            "maxsize": self.cache.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "queries": self.queries,
+            "query_seconds": self.query_seconds,
+            # Each hit stands in for one query at the observed average cost
+            "saved_seconds": self.hits * average_query,
+        }
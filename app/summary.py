@@ -0,0 +1,113 @@
+# /backend/app/summary.py
+#
+# Per-student result summary: per-subject totals, percentage, grade, pass/fail
+# and class rank, computed by one aggregation rooted at the student.
+
+from typing import Optional
+
+PASS_PERCENTAGE = 40
+
+# Same bands the marksheet has always used
+GRADE_BANDS = ((90, "A+"), (80, "A"), (70, "B"), (60, "C"), (50, "D"))
+
+
+def calculate_grade(percentage: float) -> str:
+    for threshold, grade in GRADE_BANDS:
+        if percentage >= threshold:
+            return grade
+    return "F"
+
+
+def _percentage(marks: float, max_marks: float) -> float:
+    return marks / max_marks * 100 if max_marks else 0.0
+
+
+def student_summary_pipeline(roll_number: str) -> list:
+    return [
+        {"$match": {"roll_number": roll_number}},
+        # This student's marks, totalled per subject
+        {
+            "$lookup": {
+                "from": "marks",
+                "localField": "roll_number",
+                "foreignField": "student_id",
+                "pipeline": [
+                    {
+                        "$group": {
+                            "_id": "$subject",
+                            "marks": {"$sum": "$marks"},
+                            "max_marks": {"$sum": "$max_marks"},
+                            "exams": {"$sum": 1},
+                        }
+                    },
+                    {"$sort": {"_id": 1}},
+                ],
+                "as": "subjects",
+            }
+        },
+        # Overall totals for every classmate (including this student) to rank against
+        {
+            "$lookup": {
+                "from": "students",
+                "localField": "class_name",
+                "foreignField": "class_name",
+                "pipeline": [
+                    {
+                        "$lookup": {
+                            "from": "marks",
+                            "localField": "roll_number",
+                            "foreignField": "student_id",
+                            "pipeline": [
+                                {"$group": {"_id": None, "marks": {"$sum": "$marks"}, "max_marks": {"$sum": "$max_marks"}}}
+                            ],
+                            "as": "totals",
+                        }
+                    },
+                    {"$unwind": "$totals"},
+                    {"$project": {"_id": 0, "roll_number": 1, "marks": "$totals.marks", "max_marks": "$totals.max_marks"}},
+                ],
+                "as": "classmates",
+            }
+        },
+        {"$project": {"_id": 0, "name": 1, "roll_number": 1, "class_name": 1, "section": 1, "subjects": 1, "classmates": 1}},
+    ]
+
+
+def build_summary(doc: dict) -> dict:
+    subjects = []
+    for row in doc["subjects"]:
+        percentage = _percentage(row["marks"], row["max_marks"])
+        subjects.append({
+            "subject": row["_id"],
+            "marks": row["marks"],
+            "max_marks": row["max_marks"],
+            "exams": row["exams"],
+            "percentage": round(percentage, 2),
+            "grade": calculate_grade(percentage),
+            "passed": percentage >= PASS_PERCENTAGE,
+        })
+
+    total_marks = sum(s["marks"] for s in subjects)
+    total_max_marks = sum(s["max_marks"] for s in subjects)
+    percentage = _percentage(total_marks, total_max_marks)
+
+    # Rank = 1 + classmates with a strictly higher overall percentage
+    class_rank: Optional[int] = None
+    ranked = [_percentage(c["marks"], c["max_marks"]) for c in doc["classmates"]]
+    if subjects:
+        class_rank = 1 + sum(1 for other in ranked if other > percentage)
+
+    return {
+        "roll_number": doc["roll_number"],
+        "name": doc["name"],
+        "class_name": doc["class_name"],
+        "section": doc.get("section"),
+        "subjects": subjects,
+        "total_marks": total_marks,
+        "total_max_marks": total_max_marks,
+        "percentage": round(percentage, 2),
+        "grade": calculate_grade(percentage) if subjects else None,
+        "passed": bool(subjects) and all(s["passed"] for s in subjects),
+        "class_rank": class_rank,
+        "class_size": len(ranked),
+    }
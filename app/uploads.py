@@ -0,0 +1,100 @@
+# /backend/app/uploads.py
+from fastapi import HTTPException, Request
+from typing import AsyncIterator, Optional
+import csv
+import io
+import json
+
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+NOT_UTF8 = "Not valid UTF-8 text; save the file as UTF-8 (\"CSV UTF-8\" in Excel)"
+
+
+def upload_format(request: Request) -> str:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in CSV_CONTENT_TYPES:
+        return "csv"
+    if content_type in NDJSON_CONTENT_TYPES:
+        return "ndjson"
+    raise HTTPException(
+        status_code=415,
+        detail="Upload must be sent as text/csv or application/x-ndjson",
+    )
+
+
+async def iter_upload_lines(request: Request) -> AsyncIterator[bytes]:
+    # Split the body into lines as it arrives so large uploads are never buffered whole
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def iter_upload_records(request: Request, fmt: str) -> AsyncIterator[tuple[int, bytes]]:
+    """Yield (line_number, record): one line, or for CSV every line a quoted field spans.
+
+    line_number is the record's first line. Quotes are counted on the raw bytes, which
+    holds in any ASCII-compatible encoding, so a record is complete before it is decoded.
+    """
+    line_number = 0
+    start, record, quotes = 0, [], 0
+    async for line in iter_upload_lines(request):
+        line_number += 1
+        if not record:
+            start = line_number
+        record.append(line)
+        if fmt == "csv":
+            quotes += line.count(b'"')
+            if quotes % 2:
+                continue  # Inside a quoted field; the newline belongs to the value
+        yield start, b"\n".join(record)
+        record, quotes = [], 0
+    if record:
+        yield start, b"\n".join(record)  # Ends inside a quoted field
+
+
+async def iter_upload_rows(request: Request) -> AsyncIterator[tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (line_number, row, error) for each non-blank data line of a CSV or NDJSON upload."""
+    fmt = upload_format(request)
+    header = None
+    async for line_number, record in iter_upload_records(request, fmt):
+        try:
+            line = record.decode("utf-8").rstrip("\r")
+        except UnicodeDecodeError:
+            if fmt == "csv" and header is None:
+                # Nothing has been imported yet, and without a header no row can be read
+                raise HTTPException(status_code=400, detail=NOT_UTF8)
+            yield line_number, None, NOT_UTF8
+            continue
+        if line_number == 1:
+            line = line.lstrip("\ufeff")
+        if not line.strip():
+            continue
+
+        if fmt == "csv":
+            if record.count(b'"') % 2:
+                yield line_number, None, "Quoted field is never closed"
+                continue
+            # newline="" keeps line breaks inside quoted fields as they were sent
+            values = next(csv.reader(io.StringIO(line, newline="")))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield line_number, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            yield line_number, dict(zip(header, (value.strip() for value in values))), None
+        else:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, "Each line must be a JSON object"
+                continue
+            yield line_number, row, None
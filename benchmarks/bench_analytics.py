@@ -0,0 +1,199 @@
+# /backend/benchmarks/bench_analytics.py
+#
+# Compares app.analytics.MarksAnalytics with the aggregation pipelines that
+# would answer the same questions:
+#
+#   distribution  per-group count, mean, std, min, max, pass rate, histogram and
+#                 percentiles ($group + a bucketing $group + $percentile)
+#   pass rates    share of marks at or above each of several thresholds
+#
+# for each grouping (subject, class, student). The engine's one-off load time
+# and array size are reported separately. $percentile needs MongoDB 7.0; on
+# older servers the percentile pipeline is skipped and reported as such.
+#
+# Run from the repository root against a local mongod:
+#   python benchmarks/bench_analytics.py --marks 100000,1000000
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
+from dotenv import load_dotenv
+
+from app.analytics import MarksAnalytics
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+SUBJECTS = ["Mathematics", "Science", "English", "History", "Computer Science"]
+PERCENTILES = (25, 50, 75)
+BINS = 10
+PASS_THRESHOLD = 40
+THRESHOLDS = (35, 40, 50, 60)
+
+PERCENTAGE = {"$multiply": [100, {"$divide": ["$marks", "$max_marks"]}]}
+
+
+def group_key(group_by):
+    # Class and student groupings need the student; subject doesn't
+    return {"subject": "$subject", "class": "$student.class_name", "student": "$student_id"}[group_by]
+
+
+def join_stages(group_by):
+    if group_by == "subject":
+        return []
+    return [
+        {"$lookup": {"from": "students", "localField": "student_id", "foreignField": "roll_number", "as": "student"}},
+        {"$unwind": "$student"},
+    ]
+
+
+def prepare(group_by):
+    return [*join_stages(group_by), {"$set": {"value": PERCENTAGE, "group": group_key(group_by)}}]
+
+
+def stats_pipeline(group_by):
+    return [*prepare(group_by), {"$group": {
+        "_id": "$group",
+        "count": {"$sum": 1},
+        "mean": {"$avg": "$value"},
+        "std": {"$stdDevPop": "$value"},
+        "min": {"$min": "$value"},
+        "max": {"$max": "$value"},
+        "passed": {"$sum": {"$cond": [{"$gte": ["$value", PASS_THRESHOLD]}, 1, 0]}},
+    }}]
+
+
+def histogram_pipeline(group_by):
+    return [*prepare(group_by), {"$group": {
+        "_id": {"group": "$group", "bin": {"$min": [BINS - 1, {"$floor": {"$divide": ["$value", 100 / BINS]}}]}},
+        "count": {"$sum": 1},
+    }}]
+
+
+def percentile_pipeline(group_by):
+    return [*prepare(group_by), {"$group": {
+        "_id": "$group",
+        "percentiles": {"$percentile": {"input": "$value", "p": [q / 100 for q in PERCENTILES], "method": "approximate"}},
+    }}]
+
+
+def pass_rates_pipeline(group_by):
+    return [*prepare(group_by), {"$group": {
+        "_id": "$group",
+        "count": {"$sum": 1},
+        **{f"t{t}": {"$sum": {"$cond": [{"$gte": ["$value", t]}, 1, 0]}} for t in THRESHOLDS},
+    }}]
+
+
+async def seed(db, students, total_marks):
+    await db.students.drop()
+    await db.marks.drop()
+    await db.students.create_index("roll_number", unique=True)
+    await db.marks.create_index([("student_id", 1), ("subject", 1), ("exam_date", 1)])
+
+    docs = [
+        {"name": f"Student {n}", "roll_number": f"R{n:06d}", "class_name": f"Class {n % 50}", "section": "A", "subjects": {}}
+        for n in range(students)
+    ]
+    await db.students.insert_many(docs)
+
+    start = datetime(2024, 1, 1)
+    batch = []
+    for _ in range(total_marks):
+        batch.append({
+            "student_id": random.choice(docs)["roll_number"],
+            "subject": random.choice(SUBJECTS),
+            "marks": float(random.randint(0, 100)),
+            "max_marks": 100.0,
+            "exam_date": start + timedelta(days=random.randint(0, 365)),
+        })
+        if len(batch) == 10000:
+            await db.marks.insert_many(batch)
+            batch = []
+    if batch:
+        await db.marks.insert_many(batch)
+
+
+async def timed(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = await fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+async def run_pipelines(db, pipelines):
+    return [await db.marks.aggregate(pipeline, allowDiskUse=True).to_list(None) for pipeline in pipelines]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--marks", default="100000,1000000")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--group-by", default="subject,class,student")
+    parser.add_argument("--db", default="student_marksheet_bench")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[args.db]
+
+    for size in (int(s) for s in args.marks.split(",")):
+        print(f"\nSeeding {args.students} students, {size} marks...")
+        await seed(db, args.students, size)
+
+        engine = MarksAnalytics(db)
+        started = time.perf_counter()
+        await engine.load()
+        stats = engine.stats()
+        print(f"{size:>8} marks  engine load {time.perf_counter() - started:8.2f} s  arrays {stats['bytes'] / 2**20:.1f} MB")
+
+        try:
+            await db.marks.aggregate(percentile_pipeline("subject")).to_list(None)
+            has_percentile = True
+        except OperationFailure:
+            has_percentile = False
+            print(f"{size:>8} marks  $percentile unsupported by this server; pipeline percentiles skipped")
+
+        for group_by in args.group_by.split(","):
+            pipelines = [stats_pipeline(group_by), histogram_pipeline(group_by)]
+            if has_percentile:
+                pipelines.append(percentile_pipeline(group_by))
+            pipeline_time, (pipeline_stats, *_) = await timed(lambda: run_pipelines(db, pipelines), args.repeats)
+            engine_time, distribution = await timed(
+                lambda: engine.distribution(group_by, percentiles=PERCENTILES, bins=BINS, pass_threshold=PASS_THRESHOLD),
+                args.repeats,
+            )
+
+            # Same groups, counts and means before the timings mean anything
+            expected = {row["_id"]: (row["count"], round(row["mean"], 6)) for row in pipeline_stats}
+            got = {row["_id"]: (row["count"], round(row["mean"], 6)) for row in distribution["groups"]}
+            assert got == expected, f"distribution by {group_by} differs from the pipeline"
+
+            pass_pipeline_time, _ = await timed(lambda: run_pipelines(db, [pass_rates_pipeline(group_by)]), args.repeats)
+            pass_engine_time, _ = await timed(lambda: engine.pass_rates(THRESHOLDS, group_by), args.repeats)
+
+            print(
+                f"{size:>8} marks  by {group_by:<8} distribution  pipelines {pipeline_time * 1000:9.1f} ms"
+                f"  engine {engine_time * 1000:8.1f} ms"
+            )
+            print(
+                f"{size:>8} marks  by {group_by:<8} pass rates    pipeline  {pass_pipeline_time * 1000:9.1f} ms"
+                f"  engine {pass_engine_time * 1000:8.1f} ms"
+            )
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
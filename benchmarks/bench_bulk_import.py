@@ -0,0 +1,87 @@
+# /backend/benchmarks/bench_bulk_import.py
+#
+# Measures POST /students/bulk throughput in rows per second, optionally
+# against the same number of single POST /students/ calls.
+#
+# Requires a running server and the admin account from app/create_admin.py:
+#   pip install httpx
+#   python benchmarks/bench_bulk_import.py --rows 2000 --format csv --compare-single 200
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+
+def generate_rows(count, prefix):
+    for i in range(count):
+        yield {
+            "name": f"Bench Student {i}",
+            "roll_number": f"{prefix}{i:06d}",
+            "class_name": f"Class {i % 12 + 1}",
+            "section": "ABCD"[i % 4],
+        }
+
+
+def encode(rows, fmt):
+    # Yield the body in pieces so the server sees a streamed upload
+    if fmt == "csv":
+        yield b"name,roll_number,class_name,section\n"
+        for row in rows:
+            yield f"{row['name']},{row['roll_number']},{row['class_name']},{row['section']}\n".encode()
+    else:
+        for row in rows:
+            yield (json.dumps(row) + "\n").encode()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--compare-single", type=int, default=0,
+                        help="also time this many one-by-one POST /students/ calls")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+        response = await client.post("/token", data={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        prefix = f"B{uuid.uuid4().hex[:6]}"
+        content_type = "text/csv" if args.format == "csv" else "application/x-ndjson"
+
+        async def body():
+            for piece in encode(generate_rows(args.rows, prefix), args.format):
+                yield piece
+
+        started = time.perf_counter()
+        response = await client.post(
+            "/students/bulk",
+            content=body(),
+            headers={**headers, "Content-Type": content_type},
+        )
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        result = response.json()
+        print(f"bulk {args.format}: {result['inserted']} inserted, {result['failed']} failed "
+              f"in {elapsed:.2f}s -> {result['inserted'] / elapsed:.1f} rows/s")
+
+        if args.compare_single:
+            single_prefix = f"S{uuid.uuid4().hex[:6]}"
+            started = time.perf_counter()
+            for row in generate_rows(args.compare_single, single_prefix):
+                response = await client.post("/students/", json={**row, "subjects": {}}, headers=headers)
+                response.raise_for_status()
+            elapsed = time.perf_counter() - started
+            print(f"single POST /students/: {args.compare_single} rows in {elapsed:.2f}s "
+                  f"-> {args.compare_single / elapsed:.1f} rows/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
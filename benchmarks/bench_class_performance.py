@@ -0,0 +1,227 @@
+# /backend/benchmarks/bench_class_performance.py
+#
+# Compares three ways of serving /reports/class-performance: the original
+# per-class loop, a single aggregation, and the report_snapshots read the
+# endpoint now uses.
+#
+# Run from the repository root against a local mongod:
+#   python benchmarks/bench_class_performance.py --marks 100000
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+from app.reports import ReportSnapshots
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+SUBJECTS = ["Mathematics", "Science", "English", "History", "Computer Science"]
+
+# Joins each student to a per-student summary of their marks, then rolls the
+# summaries up by class, so the whole report is one aggregation
+CLASS_PERFORMANCE_PIPELINE = [
+    {
+        "$lookup": {
+            "from": "marks",
+            "let": {"roll_number": "$roll_number"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$student_id", "$$roll_number"]}}},
+                {
+                    "$group": {
+                        "_id": None,
+                        "score_total": {"$sum": "$marks"},
+                        "pass_count": {
+                            "$sum": {
+                                "$cond": [{"$gte": ["$marks", 40]}, 1, 0]
+                            }
+                        },
+                        "total_entries": {"$sum": 1}
+                    }
+                }
+            ],
+            "as": "marks_stats"
+        }
+    },
+    {
+        "$unwind": {
+            "path": "$marks_stats",
+            "preserveNullAndEmptyArrays": True  # Students without marks still count towards total_students
+        }
+    },
+    {
+        "$group": {
+            "_id": "$class_name",
+            "total_students": {"$sum": 1},
+            "score_total": {"$sum": {"$ifNull": ["$marks_stats.score_total", 0]}},
+            "pass_count": {"$sum": {"$ifNull": ["$marks_stats.pass_count", 0]}},
+            "total_entries": {"$sum": {"$ifNull": ["$marks_stats.total_entries", 0]}}
+        }
+    },
+    {
+        "$project": {
+            "_id": 1,
+            "total_students": 1,
+            "average_score": {
+                "$cond": [
+                    {"$gt": ["$total_entries", 0]},
+                    {"$divide": ["$score_total", "$total_entries"]},
+                    0
+                ]
+            },
+            "pass_rate": {
+                "$cond": [
+                    {"$gt": ["$total_entries", 0]},
+                    {"$divide": ["$pass_count", "$total_entries"]},
+                    0
+                ]
+            }
+        }
+    }
+]
+
+
+async def seed(db, classes, students_per_class, total_marks):
+    await db.students.drop()
+    await db.marks.drop()
+    await db.report_snapshots.drop()
+    await db.students.create_index("roll_number", unique=True)
+    await db.marks.create_index("student_id")
+
+    students = []
+    for c in range(classes):
+        for n in range(students_per_class):
+            students.append({
+                "name": f"Student {c}-{n}",
+                "roll_number": f"R{c:03d}{n:04d}",
+                "class_name": f"Class {c}",
+                "section": "A",
+                "subjects": {},
+            })
+    await db.students.insert_many(students)
+
+    rolls = [s["roll_number"] for s in students]
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(total_marks):
+        batch.append({
+            "student_id": random.choice(rolls),
+            "subject": random.choice(SUBJECTS),
+            "marks": float(random.randint(0, 100)),
+            "max_marks": 100.0,
+            "exam_date": start + timedelta(days=random.randint(0, 365)),
+        })
+        if len(batch) == 10000:
+            await db.marks.insert_many(batch)
+            batch = []
+    if batch:
+        await db.marks.insert_many(batch)
+
+
+async def class_performance_loop(db):
+    # The previous implementation: one students $group, then one marks query per class
+    classes = await db.students.aggregate([
+        {
+            "$group": {
+                "_id": "$class_name",
+                "total_students": {"$sum": 1},
+                "students": {"$push": {"roll_number": "$roll_number", "name": "$name"}}
+            }
+        }
+    ]).to_list(None)
+
+    result = []
+    for class_group in classes:
+        student_roll_numbers = [s["roll_number"] for s in class_group["students"]]
+        marks_stats = await db.marks.aggregate([
+            {"$match": {"student_id": {"$in": student_roll_numbers}}},
+            {
+                "$group": {
+                    "_id": None,
+                    "average_score": {"$avg": "$marks"},
+                    "pass_count": {"$sum": {"$cond": [{"$gte": ["$marks", 40]}, 1, 0]}},
+                    "total_entries": {"$sum": 1}
+                }
+            }
+        ]).to_list(None)
+        class_data = {
+            "_id": class_group["_id"],
+            "total_students": class_group["total_students"],
+            "average_score": 0,
+            "pass_rate": 0
+        }
+        if marks_stats:
+            class_data["average_score"] = marks_stats[0].get("average_score", 0)
+            total_entries = marks_stats[0].get("total_entries", 0)
+            if total_entries > 0:
+                class_data["pass_rate"] = marks_stats[0].get("pass_count", 0) / total_entries
+        result.append(class_data)
+    return result
+
+
+async def class_performance_single(db):
+    return await db.students.aggregate(CLASS_PERFORMANCE_PIPELINE).to_list(None)
+
+
+async def class_performance_snapshots(db):
+    return await ReportSnapshots(db).class_performance()
+
+
+async def timed(fn, db, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await fn(db)
+        timings.append(time.perf_counter() - started)
+    return min(timings), sum(timings) / len(timings), result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--students-per-class", type=int, default=40)
+    parser.add_argument("--marks", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="student_marksheet_bench")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[args.db]
+
+    print(f"Seeding {args.classes} classes x {args.students_per_class} students, {args.marks} marks...")
+    await seed(db, args.classes, args.students_per_class, args.marks)
+
+    loop_best, loop_avg, loop_result = await timed(class_performance_loop, db, args.repeat)
+    single_best, single_avg, single_result = await timed(class_performance_single, db, args.repeat)
+    await ReportSnapshots(db).rebuild()
+    snapshot_best, snapshot_avg, snapshot_result = await timed(class_performance_snapshots, db, args.repeat)
+
+    # All versions must agree before the timings mean anything
+    for result in (single_result, snapshot_result):
+        by_class = {row["_id"]: row for row in result}
+        for row in loop_result:
+            other = by_class[row["_id"]]
+            assert row["total_students"] == other["total_students"]
+            assert abs((row["average_score"] or 0) - other["average_score"]) < 1e-6
+            assert abs(row["pass_rate"] - other["pass_rate"]) < 1e-6
+
+    print(f"per-class loop:     best {loop_best * 1000:8.1f} ms  avg {loop_avg * 1000:8.1f} ms")
+    print(f"single aggregation: best {single_best * 1000:8.1f} ms  avg {single_avg * 1000:8.1f} ms")
+    print(f"report snapshots:   best {snapshot_best * 1000:8.1f} ms  avg {snapshot_avg * 1000:8.1f} ms")
+    print(f"speedup vs loop (best): single {loop_best / single_best:.2f}x, snapshots {loop_best / snapshot_best:.2f}x")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
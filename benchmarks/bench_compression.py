@@ -0,0 +1,160 @@
+# /backend/benchmarks/bench_compression.py
+#
+# Bytes on the wire and compression time for typical responses (a marks list,
+# a students list, the static JS and CSS) sent through app.compression's
+# middleware as identity, gzip and, when the brotli package is installed, br.
+#
+# Then a modelled page load over a given link: a first visit, and a repeat visit
+# with the assets in the browser cache. Before fingerprinting every asset is
+# revalidated on each visit (a round trip per file, answered 304); after, the
+# fingerprinted assets are immutable and a repeat visit requests only the page.
+# No server or database is needed.
+#
+#   python benchmarks/bench_compression.py --rows 1000 --mbps 10 --rtt-ms 80
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+
+from app.compression import CompressionMiddleware, brotli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUBJECTS = ["Mathematics", "Science", "English", "History", "Computer Science"]
+ASSETS = {"js/main.js": "application/javascript", "css/style.css": "text/css"}
+HEADERS_BYTES = 400  # Rough size of a request/response header exchange
+
+
+def marks_payload(rows):
+    return orjson.dumps([
+        {
+            "_id": f"{i:024x}",
+            "student_id": f"R{i % 500:06d}",
+            "subject": SUBJECTS[i % len(SUBJECTS)],
+            "marks": float(i * 37 % 100),
+            "max_marks": 100.0,
+            "exam_date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T00:00:00",
+        }
+        for i in range(rows)
+    ])
+
+
+def students_payload(rows):
+    return orjson.dumps([
+        {
+            "_id": f"{i:024x}",
+            "name": f"Student {i}",
+            "roll_number": f"R{i:06d}",
+            "class_name": f"Class {i % 12 + 1}",
+            "section": "ABCD"[i % 4],
+            "subjects": {},
+        }
+        for i in range(rows)
+    ])
+
+
+def payloads(rows):
+    items = [
+        ("GET /marks", "application/json", marks_payload(rows)),
+        ("GET /students", "application/json", students_payload(rows)),
+    ]
+    for path, content_type in ASSETS.items():
+        with open(os.path.join(ROOT, "static", path), "rb") as f:
+            items.append((f"/static/{path}", content_type, f.read()))
+    with open(os.path.join(ROOT, "templates", "index.html"), "rb") as f:
+        items.append(("GET /", "text/html", f.read()))
+    return items
+
+
+async def send_through(middleware_options, accept_encoding, content_type, body):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    sent = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sent.append(message.get("body", b""))
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    middleware = CompressionMiddleware(app, **middleware_options)
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    await middleware(scope, receive, send)
+    return b"".join(sent)
+
+
+async def measure(options, encoding, content_type, body, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        data = await send_through(options, encoding, content_type, body)
+        timings.append(time.perf_counter() - started)
+    return len(data), min(timings)
+
+
+def transfer_seconds(size, mbps, rtt):
+    return rtt + (size + HEADERS_BYTES) * 8 / (mbps * 1_000_000)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    parser.add_argument("--mbps", type=float, default=10)
+    parser.add_argument("--rtt-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    options = {"gzip_level": args.gzip_level, "brotli_quality": args.brotli_quality}
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    if brotli is None:
+        print("brotli not installed; br skipped")
+
+    sizes = {}
+    for name, content_type, body in payloads(args.rows):
+        for encoding in encodings:
+            size, seconds = await measure(options, encoding, content_type, body, args.repeats)
+            sizes[name, encoding] = size
+            print(
+                f"{name:<22} {encoding:<8} {size:>9} B  {size / len(body) * 100:6.1f}%"
+                f"  compress {seconds * 1000:7.2f} ms"
+            )
+
+    # The page and its assets are fetched in parallel after the HTML; model the
+    # critical path as the page followed by the slowest asset
+    rtt = args.rtt_ms / 1000
+    best = encodings[-1]
+    print(f"\nPage load over {args.mbps:g} Mbit/s, {args.rtt_ms:g} ms RTT")
+    for label, encoding in (("before (identity)", "identity"), (f"after ({best})", best)):
+        page = transfer_seconds(sizes["GET /", encoding], args.mbps, rtt)
+        assets = [transfer_seconds(sizes[f"/static/{path}", encoding], args.mbps, rtt) for path in ASSETS]
+        first = page + max(assets)
+        if encoding == "identity":
+            # Revalidated: a 304 round trip per asset, still on the critical path
+            repeat = page + rtt
+            requests = 1 + len(ASSETS)
+        else:
+            # Immutable: assets come straight from the cache
+            repeat = page
+            requests = 1
+        print(
+            f"{label:<18} first visit {first * 1000:7.1f} ms"
+            f"  repeat visit {repeat * 1000:7.1f} ms ({requests} request{'s' if requests > 1 else ''})"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,189 @@
+# /backend/benchmarks/bench_marks_names.py
+#
+# Compares three ways of labelling marks with student names, as /marks/ and
+# /export/marks do:
+#
+#   lookup        the previous pipeline: a $lookup into students per mark
+#   batch cache   app.names.StudentNames: one students $in query per page, cached
+#   denormalized  student_name stored on every mark (rename cost reported separately)
+#
+# Each size is timed for paging through the collection 100 marks at a time and
+# for a full export-style scan. Run from the repository root against a local mongod:
+#   python benchmarks/bench_marks_names.py --sizes 10000,100000,1000000
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+from app.names import StudentNames
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+SUBJECTS = ["Mathematics", "Science", "English", "History", "Computer Science"]
+FIELDS = {"_id": 1, "student_id": 1, "subject": 1, "marks": 1, "max_marks": 1, "exam_date": 1}
+
+# The pipeline list_marks used before the name cache
+LOOKUP_STAGES = [
+    {"$lookup": {"from": "students", "localField": "student_id", "foreignField": "roll_number", "as": "student_info"}},
+    {"$unwind": {"path": "$student_info", "preserveNullAndEmptyArrays": True}},
+    {"$project": {**FIELDS, "student_name": {"$ifNull": ["$student_info.name", "Unknown Student"]}}},
+]
+
+
+async def seed(db, students, total_marks):
+    await db.students.drop()
+    await db.marks.drop()
+    await db.students.create_index("roll_number", unique=True)
+    await db.marks.create_index([("student_id", 1), ("subject", 1), ("exam_date", 1)])
+
+    docs = [
+        {"name": f"Student {n}", "roll_number": f"R{n:06d}", "class_name": f"Class {n % 50}", "section": "A", "subjects": {}}
+        for n in range(students)
+    ]
+    await db.students.insert_many(docs)
+
+    start = datetime(2024, 1, 1)
+    batch = []
+    for _ in range(total_marks):
+        student = random.choice(docs)
+        batch.append({
+            "student_id": student["roll_number"],
+            "subject": random.choice(SUBJECTS),
+            "marks": float(random.randint(0, 100)),
+            "max_marks": 100.0,
+            "exam_date": start + timedelta(days=random.randint(0, 365)),
+            # Only read by the denormalized strategy
+            "student_name": student["name"],
+            "class_name": student["class_name"],
+        })
+        if len(batch) == 10000:
+            await db.marks.insert_many(batch)
+            batch = []
+    if batch:
+        await db.marks.insert_many(batch)
+
+
+async def page_lookup(db, names, after, limit):
+    match = {"_id": {"$gt": after}} if after else {}
+    return await db.marks.aggregate(
+        [{"$match": match}, {"$sort": {"_id": 1}}, {"$limit": limit}, *LOOKUP_STAGES]
+    ).to_list(limit)
+
+
+async def page_batch(db, names, after, limit):
+    match = {"_id": {"$gt": after}} if after else {}
+    return await names.attach(await db.marks.find(match, FIELDS).sort("_id", 1).limit(limit).to_list(limit))
+
+
+async def page_denormalized(db, names, after, limit):
+    match = {"_id": {"$gt": after}} if after else {}
+    return await db.marks.find(match, {**FIELDS, "student_name": 1}).sort("_id", 1).limit(limit).to_list(limit)
+
+
+async def scan_lookup(db, names, batch_size):
+    return [m async for m in db.marks.aggregate([{"$sort": {"_id": 1}}, *LOOKUP_STAGES], batchSize=batch_size)]
+
+
+async def scan_batch(db, names, batch_size):
+    cursor = db.marks.find({}, FIELDS).sort("_id", 1).batch_size(batch_size)
+    return [m async for m in names.attach_stream(cursor, batch_size)]
+
+
+async def scan_denormalized(db, names, batch_size):
+    cursor = db.marks.find({}, {**FIELDS, "student_name": 1}).sort("_id", 1).batch_size(batch_size)
+    return [m async for m in cursor]
+
+
+STRATEGIES = {
+    "lookup": (page_lookup, scan_lookup),
+    "batch cache": (page_batch, scan_batch),
+    "denormalized": (page_denormalized, scan_denormalized),
+}
+
+
+async def time_pages(fn, db, pages, limit):
+    # A fresh cache per run, so the batch strategy starts cold like a new worker
+    names = StudentNames(db)
+    after = None
+    timings = []
+    labelled = []
+    for _ in range(pages):
+        started = time.perf_counter()
+        page = await fn(db, names, after, limit)
+        timings.append(time.perf_counter() - started)
+        if not page:
+            break
+        labelled.extend((str(m["_id"]), m["student_name"]) for m in page)
+        after = page[-1]["_id"]
+    return sum(timings) / len(timings), labelled
+
+
+async def time_scan(fn, db, batch_size):
+    started = time.perf_counter()
+    rows = await fn(db, StudentNames(db), batch_size)
+    return time.perf_counter() - started, len(rows)
+
+
+async def time_rename(db, renames):
+    # What the denormalized strategy pays when a student's name changes
+    rolls = await db.students.distinct("roll_number")
+    timings = []
+    for roll in random.sample(rolls, min(renames, len(rolls))):
+        started = time.perf_counter()
+        await db.marks.update_many({"student_id": roll}, {"$set": {"student_name": f"Renamed {roll}"}})
+        timings.append(time.perf_counter() - started)
+    return sum(timings) / len(timings)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--renames", type=int, default=20)
+    parser.add_argument("--skip-scan", action="store_true", help="only time paging")
+    parser.add_argument("--db", default="student_marksheet_bench")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[args.db]
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"\nSeeding {args.students} students, {size} marks...")
+        await seed(db, args.students, size)
+
+        results = {}
+        for name, (page_fn, scan_fn) in STRATEGIES.items():
+            page_avg, labelled = await time_pages(page_fn, db, args.pages, args.limit)
+            scan_time = None
+            if not args.skip_scan:
+                scan_time, _ = await time_scan(scan_fn, db, args.batch_size)
+            results[name] = (page_avg, scan_time, labelled)
+
+        # All strategies must label the same marks the same way before the timings mean anything
+        expected = results["lookup"][2]
+        for name, (_, _, labelled) in results.items():
+            assert labelled == expected, f"{name} labelled marks differently"
+
+        for name, (page_avg, scan_time, _) in results.items():
+            scan = f"  full scan {scan_time:8.2f} s" if scan_time is not None else ""
+            print(f"{size:>8} marks  {name:<13} page avg {page_avg * 1000:8.2f} ms{scan}")
+        print(f"{size:>8} marks  denormalized rename sync avg {await time_rename(db, args.renames) * 1000:.2f} ms")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+# /backend/benchmarks/bench_serialization.py
+#
+# Serialization cost per 10k documents for the list endpoints: the previous
+# path (str(_id) loop, response_model validation, jsonable_encoder, stdlib
+# json) against the current one (_id already a string from $toString,
+# rendered by orjson with no re-validation). No database is needed.
+#
+#   python benchmarks/bench_serialization.py --docs 10000
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.main import Student
+
+
+def student_docs(count, string_ids):
+    return [
+        {
+            "_id": str(ObjectId()) if string_ids else ObjectId(),
+            "name": f"Student {i}",
+            "roll_number": f"R{i:06d}",
+            "class_name": f"Class {i % 12 + 1}",
+            "section": "ABCD"[i % 4],
+            "subjects": {},
+        }
+        for i in range(count)
+    ]
+
+
+def mark_docs(count, string_ids):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": str(ObjectId()) if string_ids else ObjectId(),
+            "student_id": f"R{i % 2000:06d}",
+            "subject": "Mathematics",
+            "marks": float(i % 100),
+            "max_marks": 100.0,
+            "exam_date": start + timedelta(days=i % 365),
+            "student_name": f"Student {i % 2000}",
+        }
+        for i in range(count)
+    ]
+
+
+def previous_path(docs, adapter):
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+    if adapter is not None:
+        docs = adapter.dump_python(adapter.validate_python(docs))
+    return json.dumps(jsonable_encoder(docs)).encode()
+
+
+def current_path(docs):
+    return orjson.dumps(docs)
+
+
+def best_of(fn, make_docs, repeat):
+    timings = []
+    for _ in range(repeat):
+        docs = make_docs()
+        started = time.perf_counter()
+        fn(docs)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    students_adapter = TypeAdapter(list[Student])
+    cases = [
+        ("GET /students/", student_docs, students_adapter),
+        ("GET /marks/", mark_docs, None),
+    ]
+    for name, make, adapter in cases:
+        previous = best_of(lambda docs: previous_path(docs, adapter), lambda: make(args.docs, False), args.repeat)
+        current = best_of(current_path, lambda: make(args.docs, True), args.repeat)
+        print(f"{name:<16} per {args.docs} docs: previous {previous * 1000:7.1f} ms  "
+              f"orjson {current * 1000:7.1f} ms  ({previous / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# /backend/benchmarks/bench_workers.py
+#
+# Throughput scaling of the production launcher from 1 to N workers.
+#
+# For each worker count this starts `python -m app.serve --workers n`, waits for
+# it to answer, drives it with concurrent clients for a fixed duration, then
+# stops it with SIGTERM (exercising the graceful drain). Needs a running mongod
+# and the admin account from app/create_admin.py:
+#
+#   pip install httpx
+#   python benchmarks/bench_workers.py --max-workers 8 --path /reports/subject-performance
+#   python benchmarks/bench_workers.py --path /token     # CPU-bound bcrypt logins
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def wait_until_ready(base_url, deadline):
+    async with httpx.AsyncClient(base_url=base_url, timeout=2) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/openapi.json")
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start in time")
+
+
+async def load(base_url, args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        form = {"username": args.username, "password": args.password}
+        response = await client.post("/token", data=form)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        completed = 0
+        errors = 0
+        deadline = time.perf_counter() + args.duration
+
+        async def worker():
+            nonlocal completed, errors
+            while time.perf_counter() < deadline:
+                if args.path == "/token":
+                    response = await client.post("/token", data=form)
+                else:
+                    response = await client.get(args.path, headers=headers)
+                completed += 1
+                if response.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        return completed / (time.perf_counter() - started), errors
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--path", default="/reports/subject-performance")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--preload", action="store_true")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    counts = sorted({1, *[n for n in (2, 4, 8, 16, 32) if n < args.max_workers], args.max_workers})
+    for workers in counts:
+        command = [sys.executable, "-m", "app.serve", "--host", "127.0.0.1",
+                   "--port", str(args.port), "--workers", str(workers)]
+        if args.preload:
+            command.append("--preload")
+        server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            await wait_until_ready(base_url, time.monotonic() + 60)
+            rps, errors = await load(base_url, args)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        results.append({"workers": workers, "throughput_rps": round(rps, 1), "errors": errors})
+        speedup = rps / results[0]["throughput_rps"] if results[0]["throughput_rps"] else 0
+        print(f"{workers:>3} workers: {rps:8.1f} req/s  ({speedup:.2f}x)  errors {errors}", file=sys.stderr)
+
+    json.dump({"path": args.path, "concurrency": args.concurrency, "results": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
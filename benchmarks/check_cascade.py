@@ -0,0 +1,147 @@
+# /backend/benchmarks/check_cascade.py
+#
+# Exercises app.cascade.delete_students against a real mongod, in a scratch
+# database that is dropped afterwards:
+#
+#   transaction   a class purge in several batches, each in its own transaction;
+#                 then a purge that fails part way through a batch, which must
+#                 leave that batch's marks, login and student untouched
+#   standalone    the same purge down the sequential path a standalone mongod takes
+#
+# and checks that the other class, its marks and logins survive every run.
+# Transactions need a replica set; a single-node one stands in for production:
+#
+#   mongod --replSet rs0 --dbpath /tmp/rs0    then once:    mongosh --eval "rs.initiate()"
+#   python benchmarks/check_cascade.py
+#
+# Against a standalone mongod the transaction checks are skipped (and reported).
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+from app import cascade
+from app.cascade import delete_students, supports_transactions
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+SUBJECTS = ["Mathematics", "Science", "English"]
+DOOMED = "Doomed"
+KEPT = "Kept"
+
+
+class FailingLogins:
+    """A database whose users.delete_many fails, to abort a cascade after its marks are deleted."""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    @property
+    def users(self):
+        users = self._db.users
+
+        class Users:
+            def __getattr__(self, name):
+                return getattr(users, name)
+
+            async def delete_many(self, *args, **kwargs):
+                raise RuntimeError("injected failure")
+
+        return Users()
+
+
+async def seed(db, students_per_class):
+    for name in ("students", "marks", "users"):
+        await db[name].drop()
+    students = [
+        {"name": f"{class_name} {n}", "roll_number": f"{class_name[0]}{n:05d}", "class_name": class_name, "section": "A"}
+        for class_name in (DOOMED, KEPT)
+        for n in range(students_per_class)
+    ]
+    await db.students.insert_many(students)
+    await db.marks.insert_many([
+        {"student_id": s["roll_number"], "subject": subject, "marks": 50.0, "max_marks": 100.0,
+         "exam_date": datetime(2024, 3, 1)}
+        for s in students
+        for subject in SUBJECTS
+    ])
+    await db.users.insert_many([{"username": s["roll_number"], "role": "student"} for s in students])
+
+
+async def counts(db, class_name):
+    prefix = {"$regex": f"^{class_name[0]}"}
+    return (
+        await db.students.count_documents({"class_name": class_name}),
+        await db.marks.count_documents({"student_id": prefix}),
+        await db.users.count_documents({"username": prefix}),
+    )
+
+
+def check(label, condition, failures):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        failures.append(label)
+
+
+async def check_purge(db, label, students_per_class, batch_size, failures):
+    await seed(db, students_per_class)
+    expected = (students_per_class, students_per_class * len(SUBJECTS), students_per_class)
+    removed = await delete_students(db, {"class_name": DOOMED}, batch_size=batch_size)
+    check(f"{label}: reports every student, mark and login removed",
+          (len(removed["students"]), removed["marks"], removed["users"]) == expected, failures)
+    check(f"{label}: reports the subjects touched", removed["subjects"] == sorted(SUBJECTS), failures)
+    check(f"{label}: nothing of the class is left", await counts(db, DOOMED) == (0, 0, 0), failures)
+    check(f"{label}: the other class is untouched", await counts(db, KEPT) == expected, failures)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=250, help="students per class")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--db", default="student_marksheet_cascade_check")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[args.db]
+    failures = []
+    try:
+        if await supports_transactions(client):
+            await check_purge(db, "transaction", args.students, args.batch_size, failures)
+
+            await seed(db, args.students)
+            before = await counts(db, DOOMED)
+            try:
+                await delete_students(FailingLogins(db), {"class_name": DOOMED}, batch_size=args.batch_size)
+                check("transaction: injected failure is raised", False, failures)
+            except RuntimeError:
+                check("transaction: injected failure is raised", True, failures)
+            check("transaction: a failed batch is rolled back whole", await counts(db, DOOMED) == before, failures)
+        else:
+            print(f"skip transaction checks: {MONGODB_URL} is not a replica set")
+
+        # Take the path a standalone mongod gets, whatever this server supports
+        cascade._transactions_supported[id(client)] = False
+        await check_purge(db, "standalone", args.students, args.batch_size, failures)
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("All cascade checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
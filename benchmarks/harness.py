@@ -0,0 +1,428 @@
+# /backend/benchmarks/harness.py
+#
+# Load-testing harness for every route in app/main.py.
+#
+# Seeds a synthetic school (classes x students x subjects x exams), then drives
+# each endpoint with concurrent async clients and reports throughput,
+# p50/p95/p99 latency and peak RSS per endpoint as JSON, so runs can be diffed.
+#
+#   pip install httpx                       # plus mongomock-motor for --mock
+#   python benchmarks/harness.py --classes 20 --students 40 --subjects 5 --exams 4 \
+#       --output run.json
+#   python benchmarks/harness.py ... --compare run.json   # print deltas against a previous run
+#
+# By default the app runs in-process (httpx ASGI transport) against the
+# MONGODB_URL server, in a separate database (--db) that is dropped and reseeded.
+# --mock swaps in mongomock-motor instead of a real mongod; stages it doesn't
+# implement will show up as errors for the affected endpoints. --base-url
+# drives an already-running server (seeding still goes to MONGODB_URL/--db,
+# so start that server with the same MONGODB_DB).
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+SUBJECT_NAMES = ["Mathematics", "Science", "English", "History", "Computer Science",
+                 "Geography", "Physics", "Chemistry", "Biology", "Economics"]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def current_rss_mb():
+    # /proc gives the live value on Linux; elsewhere fall back to the process peak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if platform.system() == "Darwin" else peak / 1024
+
+
+class RssSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, current_rss_mb())
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss_mb()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+async def seed(db, args, hash_password):
+    for name in ("users", "students", "marks", "report_snapshots"):
+        await db[name].drop()
+
+    subjects = SUBJECT_NAMES[:args.subjects]
+    students = [
+        {
+            "name": f"Student {c}-{n}",
+            "roll_number": f"R{c:03d}{n:04d}",
+            "class_name": f"Class {c + 1}",
+            "section": "ABCD"[n % 4],
+            "subjects": {},
+        }
+        for c in range(args.classes)
+        for n in range(args.students)
+    ]
+    await db.students.insert_many(students)
+
+    start = datetime(2024, 1, 1)
+    exam_dates = [start + timedelta(days=30 * e) for e in range(args.exams)]
+    batch = []
+    for student in students:
+        for subject in subjects:
+            for exam_date in exam_dates:
+                batch.append({
+                    "student_id": student["roll_number"],
+                    "subject": subject,
+                    "marks": float(random.randint(0, 100)),
+                    "max_marks": 100.0,
+                    "exam_date": exam_date,
+                })
+                if len(batch) >= 10000:
+                    await db.marks.insert_many(batch)
+                    batch = []
+    if batch:
+        await db.marks.insert_many(batch)
+
+    # One admin and one student account; students log in with their roll number
+    student_user = students[0]["roll_number"]
+    await db.users.insert_many([
+        {"username": "admin", "email": "admin@example.com", "full_name": "Admin User",
+         "role": "admin", "disabled": False, "hashed_password": await hash_password("admin123")},
+        {"username": student_user, "email": f"{student_user}@example.com", "full_name": students[0]["name"],
+         "role": "student", "disabled": False, "hashed_password": await hash_password(student_user)},
+    ])
+    return {
+        "students": len(students),
+        "marks": len(students) * len(subjects) * len(exam_dates),
+        "roll_numbers": [s["roll_number"] for s in students],
+        "subjects": subjects,
+        "exam_dates": exam_dates,
+        "student_user": student_user,
+    }
+
+
+class Context:
+    """State shared by request factories: tokens, known ids and a counter for unique names."""
+
+    def __init__(self, db, data, admin_token, student_token):
+        self.db = db
+        self.data = data
+        self.admin = {"Authorization": f"Bearer {admin_token}"}
+        self.student = {"Authorization": f"Bearer {student_token}"}
+        self.student_ids = []
+        self.mark_ids = []
+        self.counter = 0
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter:07d}"
+
+    def roll(self):
+        return random.choice(self.data["roll_numbers"])
+
+    def mark_body(self, roll=None):
+        return {
+            "student_id": roll or self.roll(),
+            "subject": random.choice(self.data["subjects"]),
+            "marks": float(random.randint(0, 100)),
+            "max_marks": 100.0,
+            # Whole milliseconds, as stored, so the mark can be found again by its key
+            "exam_date": datetime.utcnow().isoformat(timespec="milliseconds"),
+        }
+
+    def student_body(self, roll):
+        return {"name": f"Bench {roll}", "roll_number": roll, "class_name": "Class 1",
+                "section": "A", "subjects": {}}
+
+
+async def create_student(client, ctx):
+    roll = ctx.unique("H")
+    response = await client.post("/students/", json=ctx.student_body(roll), headers=ctx.admin)
+    response.raise_for_status()
+    return roll
+
+
+async def create_class(client, ctx):
+    # A small class with a sheet of marks, for the purge to remove
+    class_name = ctx.unique("Purge ")
+    rolls = [ctx.unique("Q") for _ in range(10)]
+    response = await client.post("/students/bulk", headers={**ctx.admin, "Content-Type": "text/csv"}, content=(
+        "name,roll_number,class_name,section\n" + "".join(f"Purge {r},{r},{class_name},A\n" for r in rolls)
+    ))
+    response.raise_for_status()
+    response = await client.post("/marks/bulk", headers=ctx.admin, json={
+        "subject": random.choice(ctx.data["subjects"]), "max_marks": 100.0,
+        "exam_date": random.choice(ctx.data["exam_dates"]).isoformat(),
+        "marks": {roll: float(random.randint(0, 100)) for roll in rolls},
+    })
+    response.raise_for_status()
+    return class_name
+
+
+async def create_mark(client, ctx):
+    body = ctx.mark_body()
+    response = await client.post("/marks/", json=body, headers=ctx.admin)
+    response.raise_for_status()
+    # The response model leaves out _id; (student, subject, exam date) is unique
+    mark = await ctx.db.marks.find_one(
+        {"student_id": body["student_id"], "subject": body["subject"], "exam_date": datetime.fromisoformat(body["exam_date"])},
+        {"_id": 1},
+    )
+    return str(mark["_id"])
+
+
+# Each factory returns (method, url, httpx kwargs). Setup it needs (e.g. a record
+# to delete) happens inside the factory and is not part of the timed request.
+ENDPOINTS = {
+    "POST /token": lambda c, ctx: ("POST", "/token", {"data": {"username": "admin", "password": "admin123"}}),
+    "GET /users/{username}": lambda c, ctx: ("GET", "/users/admin", {"headers": ctx.admin}),
+    "GET /students/": lambda c, ctx: ("GET", "/students/", {"headers": ctx.admin}),
+    "GET /students/{student_id}": lambda c, ctx: ("GET", f"/students/{ctx.roll()}", {"headers": ctx.admin}),
+    "GET /marks/": lambda c, ctx: ("GET", "/marks/", {"headers": ctx.admin}),
+    "GET /marks/ (class filter)": lambda c, ctx: ("GET", "/marks/", {"headers": ctx.admin, "params": {"class_name": "Class 1"}}),
+    "GET /marks/{student_id}": lambda c, ctx: ("GET", f"/marks/{ctx.roll()}", {"headers": ctx.admin}),
+    "GET /marks/by-roll/{roll_number} (student)": lambda c, ctx: (
+        "GET", f"/marks/by-roll/{ctx.data['student_user']}", {"headers": ctx.student}
+    ),
+    "GET /students/{roll_number}/summary (student)": lambda c, ctx: (
+        "GET", f"/students/{ctx.data['student_user']}/summary", {"headers": ctx.student}
+    ),
+    "GET /marks/id/{marks_id}": lambda c, ctx: ("GET", f"/marks/id/{random.choice(ctx.mark_ids)}", {"headers": ctx.admin}),
+    "GET /reports/class-performance": lambda c, ctx: ("GET", "/reports/class-performance", {"headers": ctx.admin}),
+    "GET /reports/subject-performance": lambda c, ctx: ("GET", "/reports/subject-performance", {"headers": ctx.admin}),
+    "GET /reports/top-performers": lambda c, ctx: ("GET", "/reports/top-performers", {"headers": ctx.admin}),
+    "GET /rankings/top": lambda c, ctx: ("GET", "/rankings/top", {"headers": ctx.admin, "params": {"scope": "class", "key": "Class 1"}}),
+    "GET /rankings/students/{roll_number}": lambda c, ctx: ("GET", f"/rankings/students/{ctx.roll()}", {"headers": ctx.admin}),
+    "GET /analytics/distribution": lambda c, ctx: ("GET", "/analytics/distribution", {"headers": ctx.admin, "params": {"group_by": "class"}}),
+    "GET /analytics/pass-rates": lambda c, ctx: ("GET", "/analytics/pass-rates", {"headers": ctx.admin, "params": {"threshold": [35, 40, 50]}}),
+    "GET /reports/terms/{term}/subject-performance": lambda c, ctx: (
+        "GET", f"/reports/terms/{ctx.data['exam_dates'][0].year}-t1/subject-performance", {"headers": ctx.admin}
+    ),
+    "GET /archive/terms": lambda c, ctx: ("GET", "/archive/terms", {"headers": ctx.admin}),
+    "GET /archive/marks": lambda c, ctx: ("GET", "/archive/marks", {"headers": ctx.admin}),
+    # Cut off before the first seeded term, so runs find nothing to move and the data stays put
+    "POST /archive/marks": lambda c, ctx: ("POST", "/archive/marks", {
+        "headers": ctx.admin, "params": {"before": ctx.data["exam_dates"][0].isoformat()},
+    }),
+    "GET /maintenance/orphaned-marks": lambda c, ctx: ("GET", "/maintenance/orphaned-marks", {"headers": ctx.admin}),
+    "POST /maintenance/orphaned-marks": lambda c, ctx: ("POST", "/maintenance/orphaned-marks", {"headers": ctx.admin}),
+    "GET /export/students": lambda c, ctx: ("GET", "/export/students", {"headers": ctx.admin, "params": {"class_name": "Class 1"}}),
+    "GET /export/marks": lambda c, ctx: ("GET", "/export/marks", {"headers": ctx.admin, "params": {"class_name": "Class 1"}}),
+    "POST /marksheets/{class_name}": lambda c, ctx: ("POST", "/marksheets/Class 1", {"headers": ctx.admin}),
+    "POST /students/": lambda c, ctx: ("POST", "/students/", {"headers": ctx.admin, "json": ctx.student_body(ctx.unique("P"))}),
+    "POST /students/bulk": lambda c, ctx: ("POST", "/students/bulk", {
+        "headers": {**ctx.admin, "Content-Type": "text/csv"},
+        "content": "name,roll_number,class_name,section\n" + "".join(
+            f"Bulk {r},{r},Class 1,A\n" for r in (ctx.unique("K") for _ in range(20))
+        ),
+    }),
+    "PUT /students/by-roll/{roll_number}": lambda c, ctx: ("PUT", f"/students/by-roll/{ctx.student_ids[-1]}", {
+        "headers": ctx.admin, "json": {**ctx.student_body(ctx.student_ids[-1]), "name": ctx.unique("Renamed ")},
+    }),
+    "POST /marks/": lambda c, ctx: ("POST", "/marks/", {"headers": ctx.admin, "json": ctx.mark_body()}),
+    "POST /marks/bulk": lambda c, ctx: ("POST", "/marks/bulk", {"headers": ctx.admin, "json": {
+        "subject": random.choice(ctx.data["subjects"]),
+        "max_marks": 100.0,
+        "exam_date": random.choice(ctx.data["exam_dates"]).isoformat(),
+        "marks": {roll: float(random.randint(0, 100)) for roll in random.sample(ctx.data["roll_numbers"], min(50, len(ctx.data["roll_numbers"])))},
+    }}),
+    "PUT /marks/{marks_id}": lambda c, ctx: ("PUT", f"/marks/{random.choice(ctx.mark_ids)}", {"headers": ctx.admin, "json": ctx.mark_body()}),
+}
+
+# Endpoints whose factory needs a fresh record created first
+SETUP_ENDPOINTS = {
+    "DELETE /marks/{marks_id}": (create_mark, lambda ctx, mark_id: ("DELETE", f"/marks/{mark_id}", {"headers": ctx.admin})),
+    "DELETE /students/by-roll/{roll_number}": (
+        create_student, lambda ctx, roll: ("DELETE", f"/students/by-roll/{roll}", {"headers": ctx.admin})
+    ),
+    "DELETE /classes/{class_name}": (
+        create_class, lambda ctx, class_name: ("DELETE", f"/classes/{class_name}", {"headers": ctx.admin})
+    ),
+}
+
+
+async def drive(client, ctx, name, args):
+    latencies = []
+    errors = 0
+    issued = 0
+    lock = asyncio.Lock()
+
+    async def worker():
+        nonlocal errors, issued
+        while True:
+            async with lock:
+                if issued >= args.requests:
+                    return
+                issued += 1
+            if name in SETUP_ENDPOINTS:
+                setup, factory = SETUP_ENDPOINTS[name]
+                method, url, kwargs = factory(ctx, await setup(client, ctx))
+            else:
+                method, url, kwargs = ENDPOINTS[name](client, ctx)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": round(rss.peak, 1) if not args.base_url else None,
+    }
+
+
+def print_comparison(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"{'endpoint':<45} {'rps':>16} {'p99 ms':>18}", file=sys.stderr)
+    for name, result in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        rps_delta = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0
+        p99_delta = (result["p99_ms"] / before["p99_ms"] - 1) * 100 if before["p99_ms"] else 0
+        print(f"{name:<45} {result['throughput_rps']:>8.1f} ({rps_delta:+5.1f}%) "
+              f"{result['p99_ms']:>9.1f} ({p99_delta:+5.1f}%)", file=sys.stderr)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--students", type=int, default=30, help="students per class")
+    parser.add_argument("--subjects", type=int, default=5, choices=range(1, len(SUBJECT_NAMES) + 1))
+    parser.add_argument("--exams", type=int, default=3, help="exams per subject")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", action="append", help="run only endpoints containing this text (repeatable)")
+    parser.add_argument("--db", default="student_marksheet_bench")
+    parser.add_argument("--mock", action="store_true", help="use mongomock-motor instead of a real mongod")
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON results to diff against")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    # Must be set before app.database reads its configuration
+    os.environ["MONGODB_DB"] = args.db
+    import app.main as main_module
+    from app.indexes import ensure_indexes
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        main_module.database.use(AsyncMongoMockClient())
+    db = main_module.db
+
+    print(f"Seeding {args.classes} classes x {args.students} students x {args.subjects} subjects "
+          f"x {args.exams} exams...", file=sys.stderr)
+    data = await seed(db, args, main_module.get_password_hash)
+    if not args.mock:
+        await ensure_indexes(db)
+    await main_module.report_snapshots.rebuild()
+
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        # Server errors come back as 500s and count as errors, as over a real connection
+        transport = httpx.ASGITransport(app=main_module.app, raise_app_exceptions=False)
+        base_url = "http://bench"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=120) as client:
+        tokens = []
+        for username, password in (("admin", "admin123"), (data["student_user"], data["student_user"])):
+            response = await client.post("/token", data={"username": username, "password": password})
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+        ctx = Context(db, data, *tokens)
+        ctx.mark_ids = [await create_mark(client, ctx) for _ in range(20)]
+        ctx.student_ids = [await create_student(client, ctx)]
+
+        names = list(ENDPOINTS) + list(SETUP_ENDPOINTS)
+        if args.only:
+            names = [n for n in names if any(text in n for text in args.only)]
+
+        results = {}
+        for name in names:
+            results[name] = await drive(client, ctx, name, args)
+            r = results[name]
+            print(f"{name:<45} {r['throughput_rps']:>8.1f} req/s  p50 {r['p50_ms']:>8.1f}  "
+                  f"p95 {r['p95_ms']:>8.1f}  p99 {r['p99_ms']:>8.1f} ms  errors {r['errors']}", file=sys.stderr)
+
+    report = {
+        "config": {
+            "classes": args.classes,
+            "students_per_class": args.students,
+            "subjects": args.subjects,
+            "exams": args.exams,
+            "students": data["students"],
+            "marks": data["marks"],
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "backend": "mongomock" if args.mock else "mongod",
+            "target": args.base_url or "in-process",
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        print_comparison(results, args.compare)
+
+    main_module.password_hasher.shutdown()
+    main_module.database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+# /backend/benchmarks/load_login.py
+#
+# Saturates POST /token with concurrent logins while a second set of clients
+# polls a cheap authenticated endpoint, then reports /token latency and the
+# throughput the other endpoint kept during the login storm.
+#
+# Requires a running server and the admin account from app/create_admin.py:
+#   pip install httpx
+#   uvicorn app.main:app
+#   python benchmarks/load_login.py --logins 64 --pollers 8 --duration 20
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login_worker(client, args, deadline, latencies, failures):
+    form = {"username": args.username, "password": args.password}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post("/token", data=form)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            failures.append(response.status_code)
+
+
+async def poll_worker(client, token, path, deadline, latencies):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get(path, headers=headers)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_phase(client, args, token, logins):
+    deadline = time.perf_counter() + args.duration
+    login_latencies, poll_latencies, failures = [], [], []
+    tasks = [
+        login_worker(client, args, deadline, login_latencies, failures)
+        for _ in range(logins)
+    ] + [
+        poll_worker(client, token, args.poll_path, deadline, poll_latencies)
+        for _ in range(args.pollers)
+    ]
+    await asyncio.gather(*tasks)
+    return login_latencies, poll_latencies, failures
+
+
+def report(name, latencies, duration):
+    if not latencies:
+        print(f"{name:<10} no requests completed")
+        return
+    print(
+        f"{name:<10} {len(latencies) / duration:8.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:7.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--logins", type=int, default=64, help="concurrent login clients")
+    parser.add_argument("--pollers", type=int, default=8, help="concurrent clients on --poll-path")
+    parser.add_argument("--poll-path", default="/users/admin")
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.logins + args.pollers)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        response = await client.post("/token", data={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        # Baseline: the polled endpoint with no logins running
+        _, baseline, _ = await run_phase(client, args, token, logins=0)
+        print("baseline (no logins)")
+        report(args.poll_path, baseline, args.duration)
+
+        login_latencies, poll_latencies, failures = await run_phase(client, args, token, logins=args.logins)
+        print(f"\nsaturated ({args.logins} concurrent logins)")
+        report("/token", login_latencies, args.duration)
+        report(args.poll_path, poll_latencies, args.duration)
+        if failures:
+            print(f"{len(failures)} login failures")
+
+        stats = await client.get("/hashing/stats", headers={"Authorization": f"Bearer {token}"})
+        if stats.status_code == 200:
+            print("\nhashing pool:", stats.json())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,6 +3,11 @@
 let currentUser = null;
 let accessToken = null;
 
+// Last loaded lists, patched in place from the /events change feed
+let studentsState = [];
+let marksState = [];
+let changeFeed = null;
+
 // DOM Elements
 const loginSection = document.getElementById("login-section");
 const adminDashboard = document.getElementById("admin-dashboard");
@@ -60,6 +65,33 @@ document.addEventListener("DOMContentLoaded", function () {
 });
 
 // Functions
+// Follow the X-Next-Cursor header until the server reports no further pages
+async function fetchAllPages(url) {
+  const items = [];
+  let cursor = null;
+  do {
+    const separator = url.includes("?") ? "&" : "?";
+    const pageUrl = cursor
+      ? `${url}${separator}cursor=${encodeURIComponent(cursor)}`
+      : url;
+    const response = await fetch(pageUrl, {
+      headers: {
+        Authorization: `Bearer ${accessToken}`,
+      },
+    });
+    if (!response.ok) {
+      return response;
+    }
+    items.push(...(await response.json()));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return {
+    ok: true,
+    json: async () => items,
+  };
+}
+
 async function handleLogin(event) {
   event.preventDefault();
   const username = document.getElementById("username").value;
@@ -132,6 +164,67 @@ async function loadStudentDetails(username) {
   }
 }
 
+// Live updates: the server pushes student/mark deltas, which are applied to the
+// loaded lists instead of refetching them after every change
+function subscribeToChanges() {
+  if (changeFeed || typeof EventSource === "undefined") return;
+
+  changeFeed = new EventSource(
+    `/events?token=${encodeURIComponent(accessToken)}`
+  );
+  changeFeed.addEventListener("student", (event) =>
+    applyStudentChange(JSON.parse(event.data))
+  );
+  changeFeed.addEventListener("mark", (event) =>
+    applyMarkChange(JSON.parse(event.data))
+  );
+  // Sent when this client fell too far behind to patch; reload everything
+  changeFeed.addEventListener("resync", () => {
+    loadStudents().then(loadMarks).catch((error) => {
+      console.error("Error resyncing:", error);
+    });
+  });
+}
+
+function liveUpdatesActive() {
+  return !!changeFeed && changeFeed.readyState === EventSource.OPEN;
+}
+
+function upsertById(items, doc) {
+  const index = items.findIndex((item) => item._id === doc._id);
+  if (index === -1) {
+    items.push(doc);
+  } else {
+    items[index] = doc;
+  }
+}
+
+function applyStudentChange(change) {
+  const student = change.doc;
+  if (change.op === "delete") {
+    studentsState = studentsState.filter((s) => s._id !== student._id);
+    // The student's marks were deleted with them
+    marksState = marksState.filter(
+      (m) => m.student_id !== student.roll_number
+    );
+    updateMarksTable(marksState);
+  } else {
+    upsertById(studentsState, student);
+  }
+  updateStudentSelect(studentsState);
+  updateStudentsTable(studentsState);
+}
+
+function applyMarkChange(change) {
+  const mark = change.doc;
+  if (change.op === "delete") {
+    marksState = marksState.filter((m) => m._id !== mark._id);
+  } else {
+    upsertById(marksState, mark);
+  }
+  updateMarksTable(marksState);
+}
+
 function showDashboard() {
   if (!loginSection || !adminDashboard || !studentDashboard) {
     showError("Required DOM elements not found");
@@ -146,6 +239,7 @@ function showDashboard() {
     setTimeout(() => {
       loadStudents();
       loadMarks();
+      subscribeToChanges();
       // Don't load reports automatically, let user click the tab
     }, 100); // Small delay to ensure DOM is ready
   } else {
@@ -223,11 +317,7 @@ async function handleAddMarks(event) {
 
 async function loadStudents() {
   try {
-    const response = await fetch("/students/", {
-      headers: {
-        Authorization: `Bearer ${accessToken}`,
-      },
-    });
+    const response = await fetchAllPages("/students/");
 
     if (!response.ok) {
       const error = await response.json();
@@ -249,6 +339,7 @@ async function loadStudents() {
       }
     });
 
+    studentsState = students;
     updateStudentSelect(students);
     updateStudentsTable(students);
     return students;
@@ -384,49 +475,34 @@ function updateStudentSelect(students) {
 
 async function loadStudentMarksheet(studentId) {
   try {
-    // Try to get marks by roll number first
-    const response = await fetch(`/marks/by-roll/${studentId}`, {
+    // Totals, grades and class rank are computed server-side in one request
+    const response = await fetch(`/students/${studentId}/summary`, {
       headers: {
         Authorization: `Bearer ${accessToken}`,
       },
     });
 
     if (response.ok) {
-      const marks = await response.json();
-      displayMarksheet(marks);
+      displayMarksheet(await response.json());
     } else {
-      // If that fails, try by MongoDB ID
-      const fallbackResponse = await fetch(`/marks/${studentId}`, {
-        headers: {
-          Authorization: `Bearer ${accessToken}`,
-        },
-      });
-
-      if (fallbackResponse.ok) {
-        const marks = await fallbackResponse.json();
-        displayMarksheet(marks);
-      } else {
-        console.error("Failed to load marks for student");
-        displayMarksheet([]); // Display empty marksheet
-      }
+      console.error("Failed to load marks for student");
+      displayMarksheet(null); // Display empty marksheet
     }
   } catch (error) {
     console.error("Error loading marksheet:", error);
     showError("Error loading marksheet");
-    displayMarksheet([]); // Display empty marksheet
+    displayMarksheet(null); // Display empty marksheet
   }
 }
 
-function displayMarksheet(marks) {
+function displayMarksheet(summary) {
   const marksheetContent = document.getElementById("marksheet-content");
-  if (!marks || marks.length === 0) {
+  if (!summary || summary.subjects.length === 0) {
     marksheetContent.innerHTML =
       '<p class="text-center">No marks available yet.</p>';
     return;
   }
 
-  let totalMarks = 0;
-  let maxTotalMarks = 0;
   let html = `
         <div class="table-responsive">
             <table class="table table-bordered">
@@ -437,44 +513,40 @@ function displayMarksheet(marks) {
                         <th>Maximum Marks</th>
                         <th>Percentage</th>
                         <th>Grade</th>
+                        <th>Result</th>
                     </tr>
                 </thead>
                 <tbody>
     `;
 
-  marks.forEach((mark) => {
-    const percentage = (mark.marks / mark.max_marks) * 100;
-    const grade = calculateGrade(percentage);
-    totalMarks += mark.marks;
-    maxTotalMarks += mark.max_marks;
-
+  summary.subjects.forEach((subject) => {
     html += `
             <tr>
-                <td>${mark.subject}</td>
-                <td>${mark.marks}</td>
-                <td>${mark.max_marks}</td>
-                <td>${percentage.toFixed(2)}%</td>
-                <td>${grade}</td>
+                <td>${subject.subject}</td>
+                <td>${subject.marks}</td>
+                <td>${subject.max_marks}</td>
+                <td>${subject.percentage.toFixed(2)}%</td>
+                <td>${subject.grade}</td>
+                <td>${subject.passed ? "Pass" : "Fail"}</td>
             </tr>
         `;
   });
 
-  const totalPercentage = (totalMarks / maxTotalMarks) * 100;
-  const overallGrade = calculateGrade(totalPercentage);
-
   html += `
                 </tbody>
                 <tfoot class="table-dark">
                     <tr>
                         <th>Total</th>
-                        <th>${totalMarks}</th>
-                        <th>${maxTotalMarks}</th>
-                        <th>${totalPercentage.toFixed(2)}%</th>
-                        <th>${overallGrade}</th>
+                        <th>${summary.total_marks}</th>
+                        <th>${summary.total_max_marks}</th>
+                        <th>${summary.percentage.toFixed(2)}%</th>
+                        <th>${summary.grade}</th>
+                        <th>${summary.passed ? "Pass" : "Fail"}</th>
                     </tr>
                 </tfoot>
             </table>
         </div>
+        <p class="text-center">Class rank: ${summary.class_rank} of ${summary.class_size}</p>
         <div class="text-center mt-3">
             <button class="btn btn-primary" onclick="printMarksheet()">Print Marksheet</button>
         </div>
@@ -483,15 +555,6 @@ function displayMarksheet(marks) {
   marksheetContent.innerHTML = html;
 }
 
-function calculateGrade(percentage) {
-  if (percentage >= 90) return "A+";
-  if (percentage >= 80) return "A";
-  if (percentage >= 70) return "B";
-  if (percentage >= 60) return "C";
-  if (percentage >= 50) return "D";
-  return "F";
-}
-
 function printMarksheet() {
   const printContent = document.getElementById("marksheet-content").innerHTML;
   const originalContent = document.body.innerHTML;
@@ -629,7 +692,7 @@ async function handleStudentForm(event) {
     if (cancelBtn) cancelBtn.remove();
 
     resetStudentForm();
-    await loadStudents(); // Reload the student list
+    if (!liveUpdatesActive()) await loadStudents(); // Reload the student list
   } catch (error) {
     showError(error.message || "An error occurred while saving student");
     console.error("Save error:", error);
@@ -735,7 +798,7 @@ async function deleteStudent(studentId) {
 
     if (response.ok) {
       showSuccess("Student deleted successfully");
-      await loadStudents();
+      if (!liveUpdatesActive()) await loadStudents();
     } else {
       const error = await response.json();
       throw new Error(error.detail || "Failed to delete student");
@@ -823,7 +886,7 @@ async function handleMarksForm(event) {
 
     showSuccess(`Marks ${marksId ? "updated" : "added"} successfully`);
     resetMarksForm();
-    await loadMarks(); // Reload the marks table
+    if (!liveUpdatesActive()) await loadMarks(); // Reload the marks table
   } catch (error) {
     showError(error.message || "An error occurred while saving marks");
     console.error("Error:", error);
@@ -849,11 +912,7 @@ async function loadMarks() {
     const students = await loadStudents();
     console.log("Students loaded, fetching marks...");
 
-    const response = await fetch("/marks/", {
-      headers: {
-        Authorization: `Bearer ${accessToken}`,
-      },
-    });
+    const response = await fetchAllPages("/marks/");
 
     if (!response.ok) {
       const error = await response.json();
@@ -870,11 +929,7 @@ async function loadMarks() {
       await createSampleMarks(students);
 
       // Fetch marks again
-      const refreshResponse = await fetch("/marks/", {
-        headers: {
-          Authorization: `Bearer ${accessToken}`,
-        },
-      });
+      const refreshResponse = await fetchAllPages("/marks/");
 
       if (refreshResponse.ok) {
         marks = await refreshResponse.json();
@@ -883,6 +938,7 @@ async function loadMarks() {
     }
 
     if (Array.isArray(marks)) {
+      marksState = marks;
       updateMarksTable(marks);
     } else {
       throw new Error("Invalid marks data format");
@@ -1109,7 +1165,7 @@ async function deleteMarks(marksId) {
 
     if (response.ok) {
       showSuccess("Marks deleted successfully");
-      loadMarks();
+      if (!liveUpdatesActive()) loadMarks();
     } else {
       const error = await response.json();
       showError(error.detail || "Failed to delete marks");